@@ -1,23 +1,52 @@
 """Executor module for executing action plans."""
 
+import io
+import logging
 import os
-import json
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Union, Tuple
+from typing import Dict, List, Any, Callable, Optional
 
-from agentcli.core.file_ops import read_file, write_file, delete_file
+from agentcli.core.file_ops import read_file, write_file, write_file_bytes, atomic_write_file, delete_file
 from agentcli.core.logger import Logger
 from agentcli.core.validator import PlanValidator
-from agentcli.core.exceptions import ExecutionError, ActionError, RollbackError, ValidationError
+from agentcli.core.exceptions import ValidationError
 from agentcli.utils.logging import logger as app_logger
 
+# Import the streaming JSON parser with error handling
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# Local aliases for functions used on every action (single global lookup)
+_isabs = os.path.isabs
+_join = os.path.join
+_exists = os.path.exists
+_getcwd = os.getcwd
+_now = datetime.now
+
+# Action types that require content, and how their errors refer to them
+_CONTENT_ACTIONS = frozenset(("create", "create_file", "modify"))
+_ACTION_NOUNS = {
+    "create": "creation",
+    "create_file": "creation",
+    "modify": "modification",
+    "delete": "deletion",
+    "patch": "patch",
+}
+
+# Potentially large fields of action log details, parsed only when needed
+_LOG_CONTENT_FIELDS = frozenset(("content", "old_content", "new_content"))
+
 
 def _auto_index_file(file_path: str):
     """Automatically index a file after creation/modification."""
     try:
         from agentcli.core.chroma_indexer import ChromaIndexer
         # Get project root directory
-        project_path = os.getcwd()
+        project_path = _getcwd()
         indexer = ChromaIndexer(project_path)
         indexer.queue_file_indexing(file_path)
         app_logger.debug(f"File queued for background indexing: {file_path}")
@@ -25,6 +54,89 @@ def _auto_index_file(file_path: str):
         app_logger.warning(f"Failed to queue file for indexing: {e}")
 
 
+def _read_log_files(log_paths):
+    """Reads several action log files, overlapping the reads in a thread pool.
+    
+    Args:
+        log_paths (list): Paths of the log files.
+        
+    Returns:
+        dict: Mapping of path to file bytes, or to the OSError raised while reading it.
+    """
+    def read(path):
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError as e:
+            return e
+    
+    if len(log_paths) < 2:
+        return {path: read(path) for path in log_paths}
+    
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=min(8, len(log_paths))) as pool:
+        return dict(zip(log_paths, pool.map(read, log_paths)))
+
+
+def _load_action_log(data: bytes) -> Dict[str, Any]:
+    """Parses an action log.
+    
+    With ijson available only the top-level fields and scalar details are
+    parsed; parsing stops at the first content field (logs always store the
+    path before the content). Use _load_log_content to fetch content fields.
+    
+    Args:
+        data (bytes): Raw log file contents.
+        
+    Returns:
+        dict: Parsed log entry.
+    """
+    if not IJSON_AVAILABLE:
+        import json
+        return json.loads(data)
+    
+    log = {}
+    details = {}
+    for prefix, event, value in ijson.parse(io.BytesIO(data)):
+        if event == "map_key":
+            if prefix == "details" and value in _LOG_CONTENT_FIELDS:
+                break
+        elif event in ("string", "number", "boolean", "null"):
+            if "." not in prefix:
+                log[prefix] = value
+            elif prefix.startswith("details.") and prefix.count(".") == 1:
+                details[prefix[len("details."):]] = value
+    log["details"] = details
+    return log
+
+
+def _load_log_content(data: bytes, details: Dict[str, Any], key: str):
+    """Returns a content field of an action log's details.
+    
+    Args:
+        data (bytes): Raw log file contents.
+        details (dict): Details as returned by _load_action_log.
+        key (str): Field name, e.g. "old_content".
+        
+    Returns:
+        The field value, or None if the log does not contain it.
+    """
+    if key in details or not IJSON_AVAILABLE:
+        return details.get(key)
+    return next(ijson.items(io.BytesIO(data), f"details.{key}"), None)
+
+
+@dataclass(slots=True)
+class CompiledAction:
+    """A plan action validated and normalized for execution."""
+    action: Dict[str, Any]
+    handler: Callable[["CompiledAction"], Dict[str, Any]]
+    path: Optional[str] = None  # absolute path
+    content: Optional[str] = None
+    content_bytes: Optional[bytes] = None  # content encoded once for writing
+    error: Optional[str] = None  # set if the action failed compilation
+
+
 class Executor:
     """Class for executing action plans."""
     
@@ -38,6 +150,8 @@ class Executor:
         self.validator = PlanValidator()
         self.executed_actions = []
         self.failed_actions = []
+        self._log_index = None
+        self._log_index_generation = -1
         
     def execute_plan(self, plan: Dict[str, Any], skip_validation: bool = False) -> Dict[str, Any]:
         """Executes an action plan.
@@ -53,14 +167,14 @@ class Executor:
             ExecutionError: If an error occurs during plan execution.
             ValidationError: If the plan fails validation.
         """
-        plan_id = plan.get("id", datetime.now().strftime("%Y%m%d%H%M%S"))
+        plan_id = plan.get("id", _now().strftime("%Y%m%d%H%M%S"))
         query = plan.get("query", "Unknown query")
         
         app_logger.info(f"Executing plan '{plan_id}'. Query: {query}")
         
         result = {
             "plan_id": plan_id,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": _now().isoformat(),
             "success": False,
             "executed_actions": [],
             "failed_actions": [],
@@ -89,55 +203,50 @@ class Executor:
                 app_logger.error(f"Validation error: {str(e)}")
                 raise
         
-        # Execute each action in the plan
-        for i, action in enumerate(plan.get("actions", [])):
-            action_type = action.get("type", "unknown")
-            description = action.get("description", "No description")
-            
-            app_logger.info(f"Executing action {i+1}/{len(plan['actions'])}: {action_type} - {description}")
+        actions = plan["actions"]
+        total = len(actions)
+        # Checked once per plan so disabled INFO logging skips message formatting
+        log_info = app_logger.isEnabledFor(logging.INFO)
+        executed_results = result["executed_actions"]
+        executed = []
+        
+        # Validate and normalize all actions up front, then run them
+        compiled = self._compile_plan(actions)
+        for i, compiled_action in enumerate(compiled, 1):
+            action = compiled_action.action
+            if log_info:
+                app_logger.info(
+                    f"Executing action {i}/{total}: "
+                    f"{action.get('type', 'unknown')} - {action.get('description', 'No description')}"
+                )
             
             try:
-                action_result = self._execute_action(action)
-                
-                if action_result["success"]:
-                    self.executed_actions.append(action)
-                    result["executed_actions"].append(action_result)
-                    app_logger.info(f"Action executed successfully: {action_result['message']}")
-                else:
-                    self.failed_actions.append(action)
-                    result["failed_actions"].append(action_result)
-                    app_logger.error(f"Action execution error: {action_result['message']}")
-                    break  # Stop execution on first error
-            except ActionError as e:
-                error_msg = f"Error executing action '{action_type}': {str(e)}"
-                app_logger.error(error_msg)
-                
-                action_result = {
-                    "action": action,
-                    "success": False,
-                    "message": str(e),
-                    "timestamp": datetime.now().isoformat(),
-                    "error": str(e)
-                }
-                
-                self.failed_actions.append(action)
-                result["failed_actions"].append(action_result)
-                break
+                action_result = compiled_action.handler(compiled_action)
             except Exception as e:
-                error_msg = f"Unexpected error executing action '{action_type}': {str(e)}"
+                # Only unexpected errors (I/O and the like) end up here
+                error_msg = f"Error executing action '{action.get('type', 'unknown')}': {str(e)}"
                 app_logger.exception(error_msg)
                 
                 action_result = {
                     "action": action,
                     "success": False,
                     "message": error_msg,
-                    "timestamp": datetime.now().isoformat(),
+                    "timestamp": _now().isoformat(),
                     "error": str(e)
                 }
-                
+            
+            if action_result["success"]:
+                executed.append(action)
+                executed_results.append(action_result)
+                if log_info:
+                    app_logger.info(f"Action executed successfully: {action_result['message']}")
+            else:
                 self.failed_actions.append(action)
                 result["failed_actions"].append(action_result)
-                break
+                app_logger.error(f"Action execution error: {action_result['message']}")
+                break  # Stop execution on first error
+        
+        self.executed_actions.extend(executed)
         
         # If no errors, mark the plan as successful
         result["success"] = len(result["failed_actions"]) == 0
@@ -153,227 +262,289 @@ class Executor:
         
         return result
     
-    def _execute_action(self, action: Dict[str, Any]) -> Dict[str, Any]:
-        """Executes a single action from the plan.
+    def _compile_plan(self, actions: List[Dict[str, Any]]) -> List[CompiledAction]:
+        """Validates and normalizes plan actions once before execution.
+        
+        Checks that only depend on the action itself (type, path, content)
+        are done here; filesystem checks stay with the handlers since earlier
+        actions may change the filesystem.
         
         Args:
-            action (dict): The action to execute.
+            actions (list): Actions from the plan.
             
         Returns:
-            dict: Execution result of the action.
-            
-        Raises:
-            ActionError: If an error occurs while executing the action.
+            list: Compiled actions in plan order. Invalid actions are compiled
+                to a handler that reports the error when reached.
         """
-        action_type = action.get("type", "unknown")
-        path = action.get("path")
-        description = action.get("description", "No description")
-        content = action.get("content")
-        
-        result = {
-            "action": action,
-            "success": False,
-            "message": "",
-            "timestamp": datetime.now().isoformat()
+        handlers = {
+            "create": self._create_file,
+            "create_file": self._create_file,
+            "modify": self._modify_file,
+            "delete": self._delete_file,
+            "patch": self._patch_file,
+            "info": self._info,
         }
+        compiled = []
+        cwd = None
         
-        try:
-            if action_type in ["create", "create_file"]:
-                # Create file
-                if not path:
-                    error_msg = "File path not specified for creation"
-                    app_logger.error(error_msg)
-                    raise ActionError(error_msg, action)
-                
-                if content is None:  # content may be an empty string
-                    error_msg = "No content specified for file creation"
-                    app_logger.error(error_msg)
-                    raise ActionError(error_msg, action)
-                
-                # If path is not absolute, use current directory
-                if not os.path.isabs(path):
-                    path = os.path.join(os.getcwd(), path)
-                
-                # Check if file already exists
-                if os.path.exists(path):
-                    error_msg = f"File already exists: {path}"
-                    app_logger.warning(error_msg)
-                    # Could raise an error or overwrite the file
-                    # Decide to overwrite with a warning
-                
-                # Create directories if they don't exist
-                directory = os.path.dirname(path)
-                if not os.path.exists(directory):
-                    os.makedirs(directory, exist_ok=True)
-                    app_logger.debug(f"Directory created: {directory}")
-                
-                app_logger.debug(f"Creating file: {path}")
-                write_file(path, content)
-                
-                # Auto-index the newly created file
-                _auto_index_file(path)
-                
-                self.logger.log_action("create", f"File created: {path}", {
-                    "path": path,
-                    "content": content  # Сохраняем содержимое для возможности восстановления
-                })
-                result["success"] = True
-                result["message"] = f"File created: {path}"
+        for action in actions:
+            action_type = action.get("type", "unknown")
+            compiled_action = CompiledAction(action=action, handler=self._reject_action)
+            compiled.append(compiled_action)
             
-            elif action_type == "modify":
-                # Modify file
-                if not path:
-                    error_msg = "File path not specified for modification"
-                    app_logger.error(error_msg)
-                    raise ActionError(error_msg, action)
-                
-                if content is None:  # content may be an empty string
-                    error_msg = "No content specified for file modification"
-                    app_logger.error(error_msg)
-                    raise ActionError(error_msg, action)
-                
-                # If path is not absolute, use current directory
-                if not os.path.isabs(path):
-                    path = os.path.join(os.getcwd(), path)
-                
-                # Check if file exists
-                if not os.path.exists(path):
-                    error_msg = f"File not found for modification: {path}"
-                    app_logger.error(error_msg)
-                    raise ActionError(error_msg, action)
-                
-                app_logger.debug(f"Modifying file: {path}")
-                # Save old content for rollback
-                old_content = read_file(path)
-                
-                # Write new content
-                write_file(path, content)
-                
-                # Auto-index the modified file
-                _auto_index_file(path)
-                
-                self.logger.log_action("modify", f"File modified: {path}", {
-                    "path": path,
-                    "old_content": old_content,
-                    "new_content": content
-                })
-                
-                result["success"] = True
-                result["message"] = f"File modified: {path}"
+            handler = handlers.get(action_type)
+            if handler is None:
+                compiled_action.error = f"Unknown action type: {action_type}"
+                continue
             
-            elif action_type == "delete":
-                # Delete file
-                if not path:
-                    error_msg = "File path not specified for deletion"
-                    app_logger.error(error_msg)
-                    raise ActionError(error_msg, action)
-                
-                # If path is not absolute, use current directory
-                if not os.path.isabs(path):
-                    path = os.path.join(os.getcwd(), path)
-                
-                # Check if file exists
-                if not os.path.exists(path):
-                    error_msg = f"File not found for deletion: {path}"
-                    app_logger.warning(error_msg)
-                    # Could raise error or treat as successful deletion
-                    # Decide to warn but treat as successful
-                    result["success"] = True
-                    result["message"] = f"File not found (already deleted): {path}"
-                    return result
-                
-                app_logger.debug(f"Deleting file: {path}")
-                # Save content for rollback
-                old_content = read_file(path)
-                
-                # Delete file
-                delete_file(path)
-                
-                self.logger.log_action("delete", f"File deleted: {path}", {
-                    "path": path,
-                    "content": old_content
-                })
-                
-                result["success"] = True
-                result["message"] = f"File deleted: {path}"
+            if action_type == "info":
+                compiled_action.handler = handler
+                continue
             
-            elif action_type == "patch":
-                # Apply patch to file
-                if not path:
-                    error_msg = "File path not specified for patch"
-                    app_logger.error(error_msg)
-                    raise ActionError(error_msg, action)
-                
-                # If path is not absolute, use current directory
-                if not os.path.isabs(path):
-                    path = os.path.join(os.getcwd(), path)
-                
-                # Check if file exists
-                if not os.path.exists(path):
-                    error_msg = f"File not found for patching: {path}"
-                    app_logger.error(error_msg)
-                    raise ActionError(error_msg, action)
-                
-                # Import PatchEngine locally to avoid circular imports
-                try:
-                    from agentcli.core.patch_engine import PatchEngine
-                    patch_engine = PatchEngine()
-                except ImportError:
-                    error_msg = "PatchEngine not available"
-                    app_logger.error(error_msg)
-                    raise ActionError(error_msg, action)
-                
-                app_logger.debug(f"Applying patch to file: {path}")
-                
-                # Save old content for rollback
-                old_content = read_file(path)
-                
-                # Get patch definition from action
-                patches = action.get("patches", [])
-                if not patches:
-                    error_msg = "No patches specified for patch action"
-                    app_logger.error(error_msg)
-                    raise ActionError(error_msg, action)
-                
-                # Apply patches
-                patch_engine.apply_patches(path, patches)
-                
-                # Read new content for logging
-                new_content = read_file(path)
-                
-                self.logger.log_action("patch", f"File patched: {path}", {
-                    "path": path,
-                    "old_content": old_content,
-                    "new_content": new_content,
-                    "patches": patches
-                })
-                
-                result["success"] = True
-                result["message"] = f"File patched: {path}"
+            path = action.get("path")
+            if not path:
+                compiled_action.error = f"File path not specified for {_ACTION_NOUNS[action_type]}"
+                continue
             
-            elif action_type == "info":
-                # Informational action, no changes required
-                app_logger.info(f"Informational action: {description}")
-                self.logger.log_action("info", description, action)
-                result["success"] = True
-                result["message"] = description
+            content = action.get("content")
+            if content is None and action_type in _CONTENT_ACTIONS:  # content may be an empty string
+                compiled_action.error = f"No content specified for file {_ACTION_NOUNS[action_type]}"
+                continue
             
-            else:
-                error_msg = f"Unknown action type: {action_type}"
-                app_logger.error(error_msg)
-                raise ActionError(error_msg, action)
+            try:
+                # If path is not absolute, use current directory
+                if not _isabs(path):
+                    if cwd is None:
+                        cwd = _getcwd()
+                    path = _join(cwd, path)
+                # Only written actions need their content encoded
+                content_bytes = content.encode('utf-8') if action_type in _CONTENT_ACTIONS else None
+            except Exception as e:
+                # A path or content of the wrong type fails this action only, as it would in its handler
+                compiled_action.error = f"Error executing action '{action_type}': {str(e)}"
+                continue
+            
+            compiled_action.handler = handler
+            compiled_action.path = path
+            compiled_action.content = content
+            compiled_action.content_bytes = content_bytes
         
-        except ActionError:
-            # Reraise action errors
-            raise
+        return compiled
+    
+    def _action_result(self, compiled_action: CompiledAction) -> Dict[str, Any]:
+        """Creates an empty execution result for an action."""
+        return {
+            "action": compiled_action.action,
+            "success": False,
+            "message": "",
+            "timestamp": _now().isoformat()
+        }
+    
+    def _reject_action(self, compiled_action: CompiledAction) -> Dict[str, Any]:
+        """Reports an action that failed compilation."""
+        return self._fail_action(self._action_result(compiled_action), compiled_action.error)
+    
+    def _create_file(self, compiled_action: CompiledAction) -> Dict[str, Any]:
+        """Creates a file."""
+        result = self._action_result(compiled_action)
+        path = compiled_action.path
+        content = compiled_action.content
         
-        except Exception as e:
-            error_msg = f"Error executing action '{action_type}': {str(e)}"
-            app_logger.exception(error_msg)
-            raise ActionError(error_msg, action, cause=e)
+        # Check if file already exists
+        if _exists(path):
+            error_msg = f"File already exists: {path}"
+            app_logger.warning(error_msg)
+            # Could raise an error or overwrite the file
+            # Decide to overwrite with a warning
         
+        # Create directories if they don't exist
+        directory = os.path.dirname(path)
+        if not _exists(directory):
+            os.makedirs(directory, exist_ok=True)
+            app_logger.debug(f"Directory created: {directory}")
+        
+        app_logger.debug(f"Creating file: {path}")
+        write_file_bytes(path, compiled_action.content_bytes)
+        
+        # Auto-index the newly created file
+        _auto_index_file(path)
+        
+        self.logger.log_action("create", f"File created: {path}", {
+            "path": path,
+            "content": content  # Сохраняем содержимое для возможности восстановления
+        })
+        result["success"] = True
+        result["message"] = f"File created: {path}"
         return result
     
+    def _modify_file(self, compiled_action: CompiledAction) -> Dict[str, Any]:
+        """Replaces the content of an existing file."""
+        result = self._action_result(compiled_action)
+        path = compiled_action.path
+        content = compiled_action.content
+        
+        # Check if file exists
+        if not _exists(path):
+            return self._fail_action(result, f"File not found for modification: {path}")
+        
+        app_logger.debug(f"Modifying file: {path}")
+        # Old content is read and decoded before the replace, so a file that
+        # cannot be logged for rollback is left untouched
+        with open(path, 'rb') as old_file:
+            old_content = old_file.read().decode('utf-8')
+        atomic_write_file(path, compiled_action.content_bytes)
+        
+        # Auto-index the modified file
+        _auto_index_file(path)
+        
+        self.logger.log_action("modify", f"File modified: {path}", {
+            "path": path,
+            "old_content": old_content,
+            "new_content": content
+        })
+        
+        result["success"] = True
+        result["message"] = f"File modified: {path}"
+        return result
+    
+    def _delete_file(self, compiled_action: CompiledAction) -> Dict[str, Any]:
+        """Deletes a file."""
+        result = self._action_result(compiled_action)
+        path = compiled_action.path
+        
+        # Check if file exists
+        if not _exists(path):
+            error_msg = f"File not found for deletion: {path}"
+            app_logger.warning(error_msg)
+            # Could raise error or treat as successful deletion
+            # Decide to warn but treat as successful
+            result["success"] = True
+            result["message"] = f"File not found (already deleted): {path}"
+            return result
+        
+        app_logger.debug(f"Deleting file: {path}")
+        # Save content for rollback
+        old_content = read_file(path)
+        
+        # Delete file
+        delete_file(path)
+        
+        self.logger.log_action("delete", f"File deleted: {path}", {
+            "path": path,
+            "content": old_content
+        })
+        
+        result["success"] = True
+        result["message"] = f"File deleted: {path}"
+        return result
+    
+    def _patch_file(self, compiled_action: CompiledAction) -> Dict[str, Any]:
+        """Applies patches to a file."""
+        result = self._action_result(compiled_action)
+        path = compiled_action.path
+        
+        # Check if file exists
+        if not _exists(path):
+            return self._fail_action(result, f"File not found for patching: {path}")
+        
+        # Import PatchEngine locally to avoid circular imports
+        try:
+            from agentcli.core.patch_engine import PatchEngine
+            patch_engine = PatchEngine()
+        except ImportError:
+            return self._fail_action(result, "PatchEngine not available")
+        
+        app_logger.debug(f"Applying patch to file: {path}")
+        
+        # Save old content for rollback
+        old_content = read_file(path)
+        
+        # Get patch definition from action
+        patches = compiled_action.action.get("patches", [])
+        if not patches:
+            return self._fail_action(result, "No patches specified for patch action")
+        
+        # Apply patches
+        patch_engine.apply_patches(path, patches)
+        
+        # Read new content for logging
+        new_content = read_file(path)
+        
+        self.logger.log_action("patch", f"File patched: {path}", {
+            "path": path,
+            "old_content": old_content,
+            "new_content": new_content,
+            "patches": patches
+        })
+        
+        result["success"] = True
+        result["message"] = f"File patched: {path}"
+        return result
+    
+    def _info(self, compiled_action: CompiledAction) -> Dict[str, Any]:
+        """Records an informational action; no changes required."""
+        action = compiled_action.action
+        description = action.get("description", "No description")
+        if app_logger.isEnabledFor(logging.INFO):
+            app_logger.info(f"Informational action: {description}")
+        self.logger.log_action("info", description, action)
+        # Built in one step: info actions cannot fail, so skip the empty result
+        return {
+            "action": action,
+            "success": True,
+            "message": description,
+            "timestamp": _now().isoformat()
+        }
+    
+    def _fail_action(self, result: Dict[str, Any], error_msg: str) -> Dict[str, Any]:
+        """Marks an action result as failed.
+        
+        Args:
+            result (dict): Action result to update.
+            error_msg (str): Error message.
+            
+        Returns:
+            dict: The updated action result.
+        """
+        app_logger.error(error_msg)
+        result["message"] = error_msg
+        result["error"] = error_msg
+        return result
+    
+    def _get_log_index(self):
+        """Returns the paths of action logs that can be rolled back, oldest first.
+        
+        The log directory scan is cached and reused until the logger writes
+        a log this executor does not know about.
+        
+        Returns:
+            list: Log file paths sorted by modification time.
+            
+        Raises:
+            FileNotFoundError: If the log directory does not exist.
+        """
+        if self._log_index is None or self._log_index_generation != self.logger.generation:
+            entries = []
+            with os.scandir(self.logger.log_dir) as it:
+                for entry in it:
+                    # Only consider regular .json logs, not ones that have already been rolled back
+                    if entry.name.endswith(".json") and not entry.name.endswith("_rolled_back.json"):
+                        entries.append((entry.stat().st_mtime, entry.path))
+            entries.sort()
+            self._log_index = [path for _, path in entries]
+            self._log_index_generation = self.logger.generation
+        return self._log_index
+    
+    def _record_log(self, log_id: str):
+        """Adds a log written through this executor to the cached log index.
+        
+        Args:
+            log_id (str): ID returned by the logger.
+        """
+        if self._log_index is not None and self._log_index_generation == self.logger.generation - 1:
+            self._log_index.append(_join(self.logger.log_dir, f"{log_id}.json"))
+            self._log_index_generation = self.logger.generation
+    
     def rollback(self, steps=1):
         """Rolls back the last executed actions.
         
@@ -387,40 +558,39 @@ class Executor:
             "success": False,
             "actions_rolled_back": [],
             "errors": [],
-            "timestamp": datetime.now().isoformat()
+            "timestamp": _now().isoformat()
         }
         
         # Get action logs in reverse order (newest first)
-        log_dir = self.logger.log_dir
-        if not os.path.exists(log_dir):
+        try:
+            log_index = self._get_log_index()
+        except FileNotFoundError:
             result["errors"].append("Action log not found")
             return result
         
-        # Only consider regular .json logs, not ones that have already been rolled back
-        log_files = sorted(
-            [f for f in os.listdir(log_dir) if f.endswith(".json") and not f.endswith("_rolled_back.json")],
-            key=lambda f: os.path.getmtime(os.path.join(log_dir, f)),
-            reverse=True
-        )
-        
         # Determine number of logs to rollback
-        logs_to_rollback = min(steps, len(log_files))
+        logs_to_rollback = min(steps, len(log_index))
         if logs_to_rollback == 0:
             result["errors"].append("No actions to roll back - action log is empty")
             app_logger.warning("Rollback attempted but no actions found in the log")
             return result
         
+        # Take the newest logs off the cached index; logs written during this
+        # rollback are appended afterwards and are not rolled back here
+        log_files = log_index[-logs_to_rollback:][::-1]
+        del log_index[-logs_to_rollback:]
+        
+        # Read all selected logs up front
+        log_data = _read_log_files(log_files)
+        
         rolled_back = 0
-        for i in range(logs_to_rollback):
-            if i >= len(log_files):
-                break
-                
-            log_path = os.path.join(log_dir, log_files[i])
-            
+        for log_path in log_files:
             try:
                 # Load log
-                with open(log_path, 'r') as f:
-                    log = json.load(f)
+                data = log_data[log_path]
+                if isinstance(data, OSError):
+                    raise data
+                log = _load_action_log(data)
                 
                 # Rollback action depending on its type
                 action_type = log.get("action")
@@ -429,10 +599,9 @@ class Executor:
                 if action_type == "create":
                     # For created file - delete it if exists, or restore if deleted
                     path = details.get("path")
-                    content = details.get("content")
                     
                     if path:
-                        if os.path.exists(path):
+                        if _exists(path):
                             # File exists - delete it (normal rollback of creation)
                             os.remove(path)
                             result["actions_rolled_back"].append({
@@ -441,25 +610,28 @@ class Executor:
                                 "description": f"File deleted, created by action: {log.get('description')}"
                             })
                             rolled_back += 1
-                        elif content is not None:
-                            # File doesn't exist but we have content - restore it
-                            write_file(path, content)
-                            _auto_index_file(path)  # Auto-index restored file
-                            result["actions_rolled_back"].append({
-                                "type": "restore",
-                                "path": path,
-                                "description": f"Deleted file restored: {path}"
-                            })
-                            rolled_back += 1
                         else:
-                            result["errors"].append(f"File not found and no content to restore: {path}")
+                            # Content is only needed when the file has to be restored
+                            content = _load_log_content(data, details, "content")
+                            if content is not None:
+                                # File doesn't exist but we have content - restore it
+                                write_file(path, content)
+                                _auto_index_file(path)  # Auto-index restored file
+                                result["actions_rolled_back"].append({
+                                    "type": "restore",
+                                    "path": path,
+                                    "description": f"Deleted file restored: {path}"
+                                })
+                                rolled_back += 1
+                            else:
+                                result["errors"].append(f"File not found and no content to restore: {path}")
                     else:
                         result["errors"].append(f"No path specified in create action")
                 
                 elif action_type == "modify":
                     # For modified file - restore previous content
                     path = details.get("path")
-                    old_content = details.get("old_content")
+                    old_content = _load_log_content(data, details, "old_content")
                     
                     if path and old_content is not None:
                         write_file(path, old_content)
@@ -476,7 +648,7 @@ class Executor:
                 elif action_type == "delete":
                     # For deleted file - restore it
                     path = details.get("path")
-                    content = details.get("content")
+                    content = _load_log_content(data, details, "content")
                     
                     if path and content is not None:
                         write_file(path, content)
@@ -491,7 +663,7 @@ class Executor:
                         result["errors"].append(f"Not enough data to restore deleted file: {path}")
                         
                 # Log the rollback action itself
-                self.logger.log_action("rollback", f"Rolled back action: {action_type} - {log.get('description')}", {
+                rollback_log_id = self.logger.log_action("rollback", f"Rolled back action: {action_type} - {log.get('description')}", {
                     "original_action_id": log.get("id"),
                     "original_action_type": action_type,
                     "path": details.get("path")
@@ -501,11 +673,14 @@ class Executor:
                 # This allows us to keep track of what's been rolled back
                 rolled_back_path = log_path.replace(".json", "_rolled_back.json")
                 os.rename(log_path, rolled_back_path)
+                self._record_log(rollback_log_id)
                 
             except Exception as e:
                 error_msg = f"Error rolling back action: {str(e)}"
                 result["errors"].append(error_msg)
                 app_logger.error(error_msg)
+                # The log may not have been renamed; rescan on the next call
+                self._log_index = None
         
         # Update result
         result["success"] = rolled_back > 0
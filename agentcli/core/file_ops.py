@@ -1,14 +1,109 @@
 """Module for file operations."""
 
+import asyncio
+import bisect
+import codecs
+import functools
+import logging
+import mmap
 import os
 import re
 import stat
 import shutil
-from typing import Optional, Union, List, Pattern, AnyStr, Tuple
+import threading
+from typing import Optional, Union, List, Pattern, AnyStr, Tuple, Iterable
 
 from agentcli.core.exceptions import FileOperationError
 from agentcli.utils.logging import logger
 
+__all__ = [
+    'read_file', 'aread_file', 'read_many',
+    'write_file', 'awrite_file', 'write_file_bytes', 'atomic_write_file',
+    'delete_file', 'create_file_if_not_exists', 'append_to_file',
+    'insert_into_file', 'replace_in_file', 'EditableFile', 'open_editable',
+    'get_file_permissions', 'set_file_permissions', 'copy_file_permissions'
+]
+
+
+# Chunk size for reads past the size reported by fstat
+BUFSIZE = 1 << 17
+
+# Buffer size for the streaming replace output (the 8 KiB default costs extra syscalls)
+WRITE_BUFSIZE = 1 << 18
+
+# Files at least this large are read through a memory map
+MMAP_THRESHOLD = 64 * 1024
+
+# Files at least this large are edited line by line instead of in memory
+STREAM_THRESHOLD = 16 * 1024 * 1024
+
+# Readahead hints are not available on every platform (e.g. Windows, macOS)
+_HAS_FADVISE = hasattr(os, 'posix_fadvise')
+
+# Scatter-gather writes are POSIX only, and limited to IOV_MAX chunks per call
+_HAS_WRITEV = hasattr(os, 'writev')
+_IOV_MAX = 1024
+
+# Changing the mode or owner through a descriptor is not available on Windows
+_HAS_FCHMOD = hasattr(os, 'fchmod')
+_HAS_FCHOWN = hasattr(os, 'fchown')
+
+
+@functools.lru_cache(maxsize=256)
+def _compile(pattern: str, flags: int = 0) -> Pattern:
+    """Compiles a regex, reusing the result for repeated edits with the same pattern."""
+    return re.compile(pattern, flags)
+
+
+# Encodings for which pure-ASCII data can take the cheaper ASCII codec
+_ASCII_COMPATIBLE = frozenset(('utf-8', 'utf8', 'ascii', 'us-ascii'))
+
+
+def _decode(data, encoding: str, errors: str) -> str:
+    """Decodes file data the way text-mode open() would, including universal newlines."""
+    content = None
+    if errors == 'strict' and encoding.lower() in _ASCII_COMPATIBLE:
+        try:
+            content = str(data, 'ascii')
+        except UnicodeDecodeError:
+            pass
+    if content is None:
+        content = str(data, encoding, errors)
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return content
+
+
+def _encode(content: str, encoding: str) -> bytes:
+    """Encodes text, using the ASCII codec for pure-ASCII content where it is equivalent."""
+    if content.isascii() and encoding.lower() in _ASCII_COMPATIBLE:
+        return content.encode('ascii')
+    return content.encode(encoding)
+
+
+def _read_all(fd: int, size: int) -> bytes:
+    """Reads a whole file with unbuffered reads, sized from fstat."""
+    # A read may return less than asked (Linux caps one read near 2 GiB), so
+    # only an empty read means EOF; past the fstat size the file has grown
+    chunks = []
+    total = 0
+    while True:
+        chunk = os.read(fd, size + 1 - total if total <= size else BUFSIZE)
+        if not chunk:
+            return chunks[0] if len(chunks) == 1 else b''.join(chunks)
+        chunks.append(chunk)
+        total += len(chunk)
+
+
+def _read_mapped(fd: int, size: int, encoding: str, errors: str) -> str:
+    """Decodes a whole file through a read-only memory map."""
+    with mmap.mmap(fd, size, access=mmap.ACCESS_READ) as mm:
+        if hasattr(mm, 'madvise'):
+            # The whole map is read front to back right away
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+            mm.madvise(mmap.MADV_WILLNEED)
+        return _decode(mm, encoding, errors)
+
 
 def read_file(file_path: str, encoding: str = 'utf-8', errors: str = 'strict') -> str:
     """Reads the contents of a file.
@@ -25,10 +120,20 @@ def read_file(file_path: str, encoding: str = 'utf-8', errors: str = 'strict') -
         FileOperationError: If the file is not found or cannot be read.
     """
     try:
-        logger.debug(f"Reading file: {file_path}")
-        with open(file_path, 'r', encoding=encoding, errors=errors) as f:
-            content = f.read()
-        logger.debug(f"Successfully read file: {file_path}, size: {len(content)} bytes")
+        logger.debug("Reading file: %s", file_path)
+        fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            size = os.fstat(fd).st_size
+            if _HAS_FADVISE and size:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            if size >= MMAP_THRESHOLD:
+                content = _read_mapped(fd, size, encoding, errors)
+            else:
+                content = _decode(_read_all(fd, size), encoding, errors)
+        finally:
+            os.close(fd)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Successfully read file: %s, size: %s bytes", file_path, len(content))
         return content
     except FileNotFoundError as e:
         logger.error(f"File not found: {file_path}")
@@ -41,6 +146,24 @@ def read_file(file_path: str, encoding: str = 'utf-8', errors: str = 'strict') -
         raise FileOperationError(f"Error reading file: {str(e)}", file_path=file_path, operation="read", cause=e)
 
 
+def _open_for_write(file_path: str, make_dirs: bool) -> int:
+    """Opens a file for writing, creating it or truncating it.
+    
+    Parent directories are only created when the open fails because they are
+    missing, so writes into existing directories cost no extra syscalls.
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+    try:
+        return os.open(file_path, flags, 0o666)
+    except FileNotFoundError:
+        dir_path = os.path.dirname(file_path)
+        if not (make_dirs and dir_path):
+            raise
+        os.makedirs(dir_path, exist_ok=True)
+        logger.debug("Directory created: %s", dir_path)
+        return os.open(file_path, flags, 0o666)
+
+
 def write_file(file_path: str, content: str, encoding: str = 'utf-8', make_dirs: bool = True) -> bool:
     """Writes content to a file.
     
@@ -57,22 +180,203 @@ def write_file(file_path: str, content: str, encoding: str = 'utf-8', make_dirs:
         FileOperationError: If unable to write to the file.
     """
     try:
-        logger.debug(f"Writing to file: {file_path}")
+        logger.debug("Writing to file: %s", file_path)
+        
+        # Encoded once up front and written unbuffered, like atomic_write_file
+        data = _encode(content, encoding)
+        fd = _open_for_write(file_path, make_dirs)
+        try:
+            _write_all(fd, data)
+        finally:
+            os.close(fd)
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Successfully wrote to file: %s, size: %s bytes", file_path, len(data))
+        return True
+    except PermissionError as e:
+        logger.error(f"No permission to write to file: {file_path}")
+        raise FileOperationError(f"No permission to write to file: {file_path}", file_path=file_path, operation="write", cause=e)
+    except Exception as e:
+        logger.error(f"Error writing to file {file_path}: {str(e)}")
+        raise FileOperationError(f"Error writing to file: {str(e)}", file_path=file_path, operation="write", cause=e)
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    """Writes all of data to a file descriptor, retrying on short writes."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _write_chunks(fd: int, chunks: List[bytes]) -> None:
+    """Writes a sequence of byte chunks, in a single writev call where available."""
+    if not _HAS_WRITEV:
+        for chunk in chunks:
+            _write_all(fd, chunk)
+        return
+    for i in range(0, len(chunks), _IOV_MAX):
+        batch = chunks[i:i + _IOV_MAX]
+        written = os.writev(fd, batch)
+        if written < sum(map(len, batch)):
+            _write_all(fd, b''.join(batch)[written:])
+
+
+def write_file_bytes(file_path: str, data: bytes, make_dirs: bool = True) -> bool:
+    """Writes already encoded content to a file.
+    
+    Args:
+        file_path (str): Path to the file.
+        data (bytes): Content to write.
+        make_dirs (bool): Create parent directories if they do not exist.
+        
+    Returns:
+        bool: Success of the operation.
+        
+    Raises:
+        FileOperationError: If unable to write to the file.
+    """
+    try:
+        logger.debug("Writing to file: %s", file_path)
         
-        if make_dirs and os.path.dirname(file_path):
-            dir_path = os.path.dirname(file_path)
-            os.makedirs(dir_path, exist_ok=True)
-            logger.debug(f"Directory created: {dir_path}")
+        fd = _open_for_write(file_path, make_dirs)
+        try:
+            _write_all(fd, data)
+        finally:
+            os.close(fd)
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Successfully wrote to file: %s, size: %s bytes", file_path, len(data))
+        return True
+    except PermissionError as e:
+        logger.error(f"No permission to write to file: {file_path}")
+        raise FileOperationError(f"No permission to write to file: {file_path}", file_path=file_path, operation="write", cause=e)
+    except Exception as e:
+        logger.error(f"Error writing to file {file_path}: {str(e)}")
+        raise FileOperationError(f"Error writing to file: {str(e)}", file_path=file_path, operation="write", cause=e)
+
+
+def _discard_temp_file(tmp_path: str) -> None:
+    """Removes a leftover temporary file, ignoring errors."""
+    try:
+        os.remove(tmp_path)
+    except OSError:
+        pass
+
+
+def _temp_path(file_path: str) -> str:
+    """Returns the sibling temporary path used to replace file_path atomically.
+    
+    The name is unique per thread, so concurrent writes of the same file from
+    one process never share a temporary file.
+    """
+    return f"{file_path}.tmp.{os.getpid()}.{threading.get_ident()}"
+
+
+def _copy_metadata_to_fd(fd: int, fd_path: str, source_stat: os.stat_result) -> None:
+    """Gives an open file the permission bits and, where allowed, the owner of a source file.
+    
+    Both changes go through the already open descriptor and are skipped when
+    they already match (the usual case for files created under the umask by
+    the file's owner). Ownership that the process may not set is left as is.
+    """
+    fd_stat = os.fstat(fd)
+    mode = stat.S_IMODE(source_stat.st_mode)
+    if mode != stat.S_IMODE(fd_stat.st_mode):
+        if _HAS_FCHMOD:
+            os.fchmod(fd, mode)
+        else:
+            os.chmod(fd_path, mode)
+    if _HAS_FCHOWN and (source_stat.st_uid, source_stat.st_gid) != (fd_stat.st_uid, fd_stat.st_gid):
+        try:
+            os.fchown(fd, source_stat.st_uid, source_stat.st_gid)
+        except PermissionError:
+            # Without privileges only the group can change, and only to one of ours
+            try:
+                os.fchown(fd, -1, source_stat.st_gid)
+            except PermissionError:
+                pass
+        if mode & (stat.S_ISUID | stat.S_ISGID):
+            # chown clears the set-id bits
+            os.fchmod(fd, mode)
+
+
+def _write_in_place(file_path: str, chunks: List[bytes], fsync: bool) -> None:
+    """Overwrites a file through its existing inode, keeping its links and metadata."""
+    fd = os.open(file_path, os.O_WRONLY | os.O_TRUNC | getattr(os, 'O_BINARY', 0))
+    try:
+        _write_chunks(fd, chunks)
+        if fsync:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_file(file_path: str, content: Union[str, bytes, List[bytes]], encoding: str = 'utf-8',
+                      fsync: bool = False, preserve_permissions: bool = True,
+                      source_stat: Optional[os.stat_result] = None) -> bool:
+    """Atomically replaces the contents of a file.
+    
+    The content is written to a sibling temporary file which is then renamed
+    over the target with ``os.replace``, so readers never observe a partially
+    written file. Permission bits and, where allowed, the owner of an existing
+    target are carried over. A symlink is kept and the file it points to is
+    replaced. A file with several hard links is overwritten in place instead,
+    since renaming over it would split it from its other names.
+    
+    Args:
+        file_path (str): Path to the file.
+        content (str | bytes | list[bytes]): Content to write; bytes are written as
+            is and a list of byte chunks is written with one gathered write.
+        encoding (str): File encoding used when content is a str.
+        fsync (bool): Flush the temporary file to disk before the rename.
+        preserve_permissions (bool): Copy the permission bits and owner of an existing target.
+        source_stat (os.stat_result, optional): The target's stat when the caller has
+            already taken it, so it is not looked up again.
+    
+    Returns:
+        bool: Success of the operation.
+    
+    Raises:
+        FileOperationError: If unable to write to the file.
+    """
+    target_path = os.path.realpath(file_path)
+    tmp_path = _temp_path(target_path)
+    try:
+        logger.debug("Atomically writing to file: %s", file_path)
+
+        if isinstance(content, str):
+            content = _encode(content, encoding)
+        chunks = content if isinstance(content, list) else [content]
+        if source_stat is None:
+            try:
+                source_stat = os.stat(target_path)
+            except FileNotFoundError:
+                pass
         
-        with open(file_path, 'w', encoding=encoding) as f:
-            f.write(content)
+        if source_stat is not None and source_stat.st_nlink > 1:
+            # Chunks may be views of a map of this very file, which truncation invalidates
+            _write_in_place(target_path, [bytes(chunk) for chunk in chunks], fsync)
+        else:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+            try:
+                if preserve_permissions and source_stat is not None:
+                    _copy_metadata_to_fd(fd, tmp_path, source_stat)
+                _write_chunks(fd, chunks)
+                if fsync:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(tmp_path, target_path)
         
-        logger.debug(f"Successfully wrote to file: {file_path}, size: {len(content)} bytes")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Successfully wrote to file: %s, size: %s bytes", file_path, sum(map(len, chunks)))
         return True
     except PermissionError as e:
+        _discard_temp_file(tmp_path)
         logger.error(f"No permission to write to file: {file_path}")
         raise FileOperationError(f"No permission to write to file: {file_path}", file_path=file_path, operation="write", cause=e)
     except Exception as e:
+        _discard_temp_file(tmp_path)
         logger.error(f"Error writing to file {file_path}: {str(e)}")
         raise FileOperationError(f"Error writing to file: {str(e)}", file_path=file_path, operation="write", cause=e)
 
@@ -91,14 +395,16 @@ def delete_file(file_path: str, check_exists: bool = True) -> bool:
         FileOperationError: If unable to delete the file.
     """
     try:
-        logger.debug(f"Deleting file: {file_path}")
+        logger.debug("Deleting file: %s", file_path)
         
-        if check_exists and not os.path.exists(file_path):
-            logger.warning(f"File does not exist for deletion: {file_path}")
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            if not check_exists:
+                raise
+            logger.warning("File does not exist for deletion: %s", file_path)
             return False
-        
-        os.remove(file_path)
-        logger.debug(f"Successfully deleted file: {file_path}")
+        logger.debug("Successfully deleted file: %s", file_path)
         return True
     except PermissionError as e:
         logger.error(f"No permission to delete file: {file_path}")
@@ -121,7 +427,7 @@ def get_file_permissions(file_path: str) -> int:
         FileOperationError: If unable to get file permissions.
     """
     try:
-        logger.debug(f"Getting file permissions for: {file_path}")
+        logger.debug("Getting file permissions for: %s", file_path)
         return os.stat(file_path).st_mode
     except PermissionError as e:
         logger.error(f"No permission to get file permissions: {file_path}")
@@ -147,9 +453,9 @@ def set_file_permissions(file_path: str, permissions: int) -> bool:
         FileOperationError: If unable to set file permissions.
     """
     try:
-        logger.debug(f"Setting file permissions for: {file_path}")
+        logger.debug("Setting file permissions for: %s", file_path)
         os.chmod(file_path, permissions)
-        logger.debug(f"Successfully set file permissions for: {file_path}")
+        logger.debug("Successfully set file permissions for: %s", file_path)
         return True
     except PermissionError as e:
         logger.error(f"No permission to set file permissions: {file_path}")
@@ -175,19 +481,38 @@ def copy_file_permissions(source_path: str, target_path: str) -> bool:
         FileOperationError: If unable to copy file permissions.
     """
     try:
-        logger.debug(f"Copying file permissions from {source_path} to {target_path}")
-        permissions = get_file_permissions(source_path)
-        set_file_permissions(target_path, permissions)
-        logger.debug(f"Successfully copied file permissions from {source_path} to {target_path}")
+        logger.debug("Copying file permissions from %s to %s", source_path, target_path)
+        shutil.copymode(source_path, target_path)
+        logger.debug("Successfully copied file permissions from %s to %s", source_path, target_path)
         return True
-    except FileOperationError:
-        raise
+    except PermissionError as e:
+        logger.error(f"No permission to copy file permissions to: {target_path}")
+        raise FileOperationError(f"No permission to copy file permissions to: {target_path}", 
+                                file_path=target_path, operation="copy_permissions", cause=e)
     except Exception as e:
         logger.error(f"Error copying file permissions: {str(e)}")
         raise FileOperationError(f"Error copying file permissions: {str(e)}", 
                                 file_path=target_path, operation="copy_permissions", cause=e)
 
 
+def _line_offset(text: AnyStr, line_number: int) -> Optional[int]:
+    """Returns the offset where a 1-based line starts, or None if out of range.
+    
+    Works on both str and bytes. The line just past the last one is valid and
+    maps to the end of the text.
+    """
+    if line_number < 1:
+        return None
+    nl = '\n' if isinstance(text, str) else b'\n'
+    offset = 0
+    for _ in range(line_number - 1):
+        if offset >= len(text):
+            return None
+        newline = text.find(nl, offset)
+        offset = len(text) if newline < 0 else newline + 1
+    return offset
+
+
 def create_file_if_not_exists(file_path: str, content: str = "", encoding: str = 'utf-8') -> bool:
     """Creates a file only if it does not exist.
     
@@ -203,14 +528,25 @@ def create_file_if_not_exists(file_path: str, content: str = "", encoding: str =
         FileOperationError: If unable to create the file.
     """
     try:
-        logger.debug(f"Checking file existence: {file_path}")
+        logger.debug("Checking file existence: %s", file_path)
         
-        if os.path.exists(file_path):
-            logger.debug(f"File already exists, skipping creation: {file_path}")
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+        try:
+            fd = os.open(file_path, flags, 0o666)
+        except FileExistsError:
+            logger.debug("File already exists, skipping creation: %s", file_path)
             return False
+        except FileNotFoundError:
+            # Parent directory is missing; write_file creates it
+            write_file(file_path, content, encoding)
+            logger.debug("File successfully created: %s", file_path)
+            return True
         
-        write_file(file_path, content, encoding)
-        logger.debug(f"File successfully created: {file_path}")
+        try:
+            _write_all(fd, _encode(content, encoding))
+        finally:
+            os.close(fd)
+        logger.debug("File successfully created: %s", file_path)
         return True
     except FileOperationError:
         raise
@@ -238,30 +574,36 @@ def append_to_file(file_path: str, content: str, encoding: str = 'utf-8',
         FileOperationError: If unable to append content.
     """
     try:
-        logger.debug(f"Appending content to file: {file_path}")
+        logger.debug("Appending content to file: %s", file_path)
         
-        if not os.path.exists(file_path):
+        try:
+            fd = os.open(file_path, os.O_WRONLY | os.O_APPEND | getattr(os, 'O_BINARY', 0))
+        except FileNotFoundError:
             if create_if_missing:
-                logger.debug(f"File does not exist, creating new: {file_path}")
+                logger.debug("File does not exist, creating new: %s", file_path)
                 return write_file(file_path, content, encoding)
             else:
                 error_msg = f"File does not exist: {file_path}"
                 logger.error(error_msg)
                 raise FileOperationError(error_msg, file_path=file_path, operation="append")
         
-        permissions = None
-        if preserve_permissions:
-            permissions = get_file_permissions(file_path)
-        
+        # Appending through the existing inode never changes its mode, so
+        # preserve_permissions needs no extra stat/chmod here
         try:
-            with open(file_path, 'a', encoding=encoding) as f:
-                f.write(content)
-            
-            logger.debug(f"Successfully appended content to file: {file_path}")
-            return True
+            if encoding.lower() in _ASCII_COMPATIBLE:
+                data = _encode(content, encoding)
+            else:
+                encoder = codecs.getincrementalencoder(encoding)()
+                if os.fstat(fd).st_size:
+                    # Like text mode, only an empty file gets a byte order mark
+                    encoder.setstate(0)
+                data = encoder.encode(content, True)
+            _write_all(fd, data)
         finally:
-            if permissions is not None:
-                set_file_permissions(file_path, permissions)
+            os.close(fd)
+        
+        logger.debug("Successfully appended content to file: %s", file_path)
+        return True
     except FileOperationError:
         raise
     except Exception as e:
@@ -272,7 +614,8 @@ def append_to_file(file_path: str, content: str, encoding: str = 'utf-8',
 
 def insert_into_file(file_path: str, content: str, position: Union[int, str, Pattern[AnyStr]], 
                   before: bool = True, encoding: str = 'utf-8', 
-                  create_if_missing: bool = False, preserve_permissions: bool = True) -> bool:
+                  create_if_missing: bool = False, preserve_permissions: bool = True,
+                  use_regex: bool = False) -> bool:
     """Inserts content at a specific position in a file.
     
     Args:
@@ -283,6 +626,7 @@ def insert_into_file(file_path: str, content: str, position: Union[int, str, Pat
         encoding (str): File encoding.
         create_if_missing (bool): Create file if it does not exist.
         preserve_permissions (bool): Preserve file permissions.
+        use_regex (bool): Treat a string position as a regular expression.
         
     Returns:
         bool: Success of the operation.
@@ -291,65 +635,93 @@ def insert_into_file(file_path: str, content: str, position: Union[int, str, Pat
         FileOperationError: If unable to insert content.
     """
     try:
-        logger.debug(f"Inserting content into file: {file_path} at position {position}")
+        logger.debug("Inserting content into file: %s at position %s", file_path, position)
         
-        if not os.path.exists(file_path):
+        try:
+            fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        except FileNotFoundError:
             if create_if_missing:
-                logger.debug(f"File does not exist, creating new: {file_path}")
+                logger.debug("File does not exist, creating new: %s", file_path)
                 return write_file(file_path, content, encoding)
             else:
                 error_msg = f"File does not exist: {file_path}"
                 logger.error(error_msg)
                 raise FileOperationError(error_msg, file_path=file_path, operation="insert")
+        try:
+            st = os.fstat(fd)
+            data = _read_all(fd, st.st_size)
+        finally:
+            os.close(fd)
         
-        permissions = None
-        if preserve_permissions:
-            permissions = get_file_permissions(file_path)
-        
-        with open(file_path, 'r', encoding=encoding) as f:
-            lines = f.readlines()
+        if use_regex and isinstance(position, str):
+            position = _compile(position)
         
-        insert_index = None
+        # Line numbers and plain strings can be located in the raw bytes when the
+        # encoding is ASCII-compatible and there are no CR line endings to translate
+        if (not isinstance(position, Pattern) and encoding.lower() in _ASCII_COMPATIBLE
+                and b'\r' not in data):
+            text = data
+            nl = b'\n'
+            needle = position if isinstance(position, int) else position.encode(encoding)
+        else:
+            text = _decode(data, encoding, 'strict')
+            nl = '\n'
+            needle = position
         
-        if isinstance(position, int):
-            if 1 <= position <= len(lines) + 1:
-                insert_index = position - 1
-            else:
-                error_msg = f"Invalid line number: {position}, total lines: {len(lines)}"
+        if isinstance(needle, int):
+            insert_offset = _line_offset(text, needle)
+            if insert_offset is None:
+                total_lines = text.count(nl) + (not text.endswith(nl) and bool(text))
+                error_msg = f"Invalid line number: {position}, total lines: {total_lines}"
                 logger.error(error_msg)
                 raise FileOperationError(error_msg, file_path=file_path, operation="insert")
         else:
-            pattern_found = False
-            for i, line in enumerate(lines):
-                if isinstance(position, Pattern):
-                    match = position.search(line)
-                    if match:
-                        insert_index = i
-                        pattern_found = True
-                        break
-                elif position in line:
-                    insert_index = i
-                    pattern_found = True
-                    break
+            if isinstance(needle, Pattern):
+                # MULTILINE keeps ^ and $ anchored to lines as in a per-line search
+                match = _compile(needle.pattern, needle.flags | re.MULTILINE).search(text)
+                match_offset = match.start() if match else -1
+            else:
+                match_offset = text.find(needle)
             
-            if not pattern_found:
+            if match_offset < 0:
                 error_msg = f"String/pattern not found: {position}"
                 logger.error(error_msg)
                 raise FileOperationError(error_msg, file_path=file_path, operation="insert")
             
-            if not before:
-                insert_index += 1
+            if before:
+                insert_offset = text.rfind(nl, 0, match_offset) + 1
+            else:
+                line_end = text.find(nl, match_offset)
+                insert_offset = len(text) if line_end < 0 else line_end + 1
         
         new_content = content if content.endswith('\n') else content + '\n'
-        lines.insert(insert_index, new_content)
-        
-        with open(file_path, 'w', encoding=encoding) as f:
-            f.writelines(lines)
+        if text is data and insert_offset == len(data):
+            # Inserting at the end of the file is a plain append
+            fd = os.open(file_path, os.O_WRONLY | os.O_APPEND | getattr(os, 'O_BINARY', 0))
+            try:
+                _write_all(fd, new_content.encode(encoding))
+            finally:
+                os.close(fd)
+            logger.debug("Successfully inserted content into file: %s at position %s", file_path, position)
+            return True
+        if text is data:
+            # The untouched head and tail are written straight from the read buffer
+            view = memoryview(data)
+            chunks = [view[:insert_offset], new_content.encode(encoding), view[insert_offset:]]
+        else:
+            # Encode the three pieces separately so they go out in one writev; the
+            # incremental encoder keeps BOM-emitting codecs correct
+            encoder = codecs.getincrementalencoder(encoding)()
+            chunks = [
+                encoder.encode(text[:insert_offset]),
+                encoder.encode(new_content),
+                encoder.encode(text[insert_offset:], True),
+            ]
         
-        logger.debug(f"Successfully inserted content into file: {file_path} at position {position}")
+        atomic_write_file(file_path, chunks, preserve_permissions=preserve_permissions,
+                          source_stat=st)
         
-        if permissions is not None:
-            set_file_permissions(file_path, permissions)
+        logger.debug("Successfully inserted content into file: %s at position %s", file_path, position)
         
         return True
     except FileOperationError:
@@ -360,8 +732,86 @@ def insert_into_file(file_path: str, content: str, position: Union[int, str, Pat
                                 file_path=file_path, operation="insert", cause=e)
 
 
+def _replace_mapped(file_path: str, fd: int, size: int, pattern: bytes, replacement: bytes,
+                    count: int, preserve_permissions: bool, source_stat: os.stat_result) -> Optional[int]:
+    """Replaces a plain byte string in a large file without decoding it.
+    
+    The file is searched through a memory map of fd and the unchanged spans
+    are written straight from the map between the replacements. Returns the
+    number of replacements, or None when the file contains CR line endings
+    and has to go through the text path instead.
+    """
+    with mmap.mmap(fd, size, access=mmap.ACCESS_READ) as mm:
+        # Text mode would translate CR line endings, which the bytes path cannot
+        if mm.find(b'\r') >= 0:
+            return None
+        view = memoryview(mm)
+        chunks = []
+        try:
+            start = 0
+            index = mm.find(pattern)
+            while index >= 0 and (count <= 0 or len(chunks) // 2 < count):
+                chunks.append(view[start:index])
+                chunks.append(replacement)
+                start = index + len(pattern)
+                index = mm.find(pattern, start)
+            num_replacements = len(chunks) // 2
+            if num_replacements:
+                chunks.append(view[start:])
+                atomic_write_file(file_path, chunks, preserve_permissions=preserve_permissions,
+                                  source_stat=source_stat)
+            return num_replacements
+        finally:
+            # Drop the slices of the map before it is closed
+            chunks.clear()
+            view.release()
+
+
+def _replace_streaming(file_path: str, pattern: str, replacement: str, encoding: str,
+                       count: int, preserve_permissions: bool, source_stat: os.stat_result) -> int:
+    """Replaces a single-line string in a very large file, one line at a time.
+    
+    The output goes to a sibling temporary file that is renamed over the
+    target only if something was replaced, so memory use stays bounded by
+    the longest line. Returns the number of replacements.
+    """
+    # Like atomic_write_file: keep symlinks, and hard-linked files keep their inode
+    target_path = os.path.realpath(file_path)
+    tmp_path = _temp_path(target_path)
+    num_replacements = 0
+    try:
+        with open(target_path, 'r', encoding=encoding, buffering=BUFSIZE) as src, \
+                open(tmp_path, 'w', encoding=encoding, buffering=WRITE_BUFSIZE) as dst:
+            if preserve_permissions:
+                _copy_metadata_to_fd(dst.fileno(), tmp_path, source_stat)
+            for line in src:
+                if pattern in line and (count <= 0 or num_replacements < count):
+                    limit = count - num_replacements if count > 0 else -1
+                    new_line = line.replace(pattern, replacement, limit)
+                    delta = len(pattern) - len(replacement)
+                    if delta:
+                        num_replacements += (len(line) - len(new_line)) // delta
+                    else:
+                        found = line.count(pattern)
+                        num_replacements += found if limit < 0 else min(found, limit)
+                    line = new_line
+                dst.write(line)
+        if num_replacements and source_stat.st_nlink > 1:
+            shutil.copyfile(tmp_path, target_path)
+            _discard_temp_file(tmp_path)
+        elif num_replacements:
+            os.replace(tmp_path, target_path)
+        else:
+            _discard_temp_file(tmp_path)
+        return num_replacements
+    except BaseException:
+        _discard_temp_file(tmp_path)
+        raise
+
+
 def replace_in_file(file_path: str, pattern: Union[str, Pattern[AnyStr]], replacement: str, 
-                   encoding: str = 'utf-8', count: int = 0, preserve_permissions: bool = True) -> Tuple[bool, int]:
+                   encoding: str = 'utf-8', count: int = 0, preserve_permissions: bool = True,
+                   use_regex: bool = False) -> Tuple[bool, int]:
     """Replaces text in a file using a pattern.
     
     Args:
@@ -371,6 +821,7 @@ def replace_in_file(file_path: str, pattern: Union[str, Pattern[AnyStr]], replac
         encoding (str): File encoding.
         count (int): Maximum number of replacements. 0 = all occurrences.
         preserve_permissions (bool): Preserve file permissions.
+        use_regex (bool): Treat a string pattern as a regular expression.
         
     Returns:
         Tuple[bool, int]: (success, number of replacements)
@@ -379,44 +830,76 @@ def replace_in_file(file_path: str, pattern: Union[str, Pattern[AnyStr]], replac
         FileOperationError: If unable to replace content.
     """
     try:
-        logger.debug(f"Replacing content in file: {file_path}")
+        logger.debug("Replacing content in file: %s", file_path)
         
-        if not os.path.exists(file_path):
+        try:
+            fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        except FileNotFoundError:
             error_msg = f"File does not exist: {file_path}"
             logger.error(error_msg)
             raise FileOperationError(error_msg, file_path=file_path, operation="replace")
         
-        permissions = None
-        if preserve_permissions:
-            permissions = get_file_permissions(file_path)
+        if use_regex and isinstance(pattern, str):
+            pattern = _compile(pattern)
         
-        with open(file_path, 'r', encoding=encoding) as f:
-            content = f.read()
+        try:
+            st = os.fstat(fd)
+            size = st.st_size
+            if (size >= MMAP_THRESHOLD and isinstance(pattern, str) and pattern
+                    and encoding.lower() in _ASCII_COMPATIBLE):
+                num_replacements = _replace_mapped(file_path, fd, size, pattern.encode(encoding),
+                                                   replacement.encode(encoding), count, preserve_permissions,
+                                                   st)
+                if num_replacements is not None:
+                    if num_replacements == 0:
+                        logger.debug("String/pattern not found, no replacements made: %s", pattern)
+                        return False, 0
+                    logger.debug("Successfully replaced %s occurrences in file: %s", num_replacements, file_path)
+                    return True, num_replacements
+            if (size >= STREAM_THRESHOLD and isinstance(pattern, str) and pattern
+                    and '\n' not in pattern and '\r' not in pattern):
+                num_replacements = _replace_streaming(file_path, pattern, replacement, encoding,
+                                                      count, preserve_permissions, st)
+                if num_replacements == 0:
+                    logger.debug("String/pattern not found, no replacements made: %s", pattern)
+                    return False, 0
+                logger.debug("Successfully replaced %s occurrences in file: %s", num_replacements, file_path)
+                return True, num_replacements
+            data = _read_all(fd, size)
+        finally:
+            os.close(fd)
+        
+        if isinstance(pattern, str) and encoding.lower() in _ASCII_COMPATIBLE:
+            # A miss in the raw bytes proves there is no match in the decoded text,
+            # unless the pattern involves line endings that text mode translates
+            if (pattern.encode(encoding) not in data
+                    and not (b'\r' in data and ('\n' in pattern or '\r' in pattern))):
+                logger.debug("String/pattern not found, no replacements made: %s", pattern)
+                return False, 0
+        
+        content = _decode(data, encoding, 'strict')
         
         if isinstance(pattern, Pattern):
-            if count > 0:
-                new_content, num_replacements = re.subn(pattern, replacement, content, count=count)
-            else:
-                new_content, num_replacements = re.subn(pattern, replacement, content)
+            new_content, num_replacements = pattern.subn(replacement, content, count=count)
         else:
-            if count > 0:
-                new_content = content.replace(pattern, replacement, count)
-                num_replacements = (content.count(pattern) if count > content.count(pattern) else count)
+            new_content = content.replace(pattern, replacement, count if count > 0 else -1)
+            # The length delta gives the number of replacements without a second scan
+            delta = len(pattern) - len(replacement)
+            if delta:
+                num_replacements = (len(content) - len(new_content)) // delta
             else:
                 num_replacements = content.count(pattern)
-                new_content = content.replace(pattern, replacement)
+                if count > 0:
+                    num_replacements = min(num_replacements, count)
         
         if num_replacements == 0:
-            logger.debug(f"String/pattern not found, no replacements made: {pattern}")
+            logger.debug("String/pattern not found, no replacements made: %s", pattern)
             return False, 0
         
-        with open(file_path, 'w', encoding=encoding) as f:
-            f.write(new_content)
-        
-        logger.debug(f"Successfully replaced {num_replacements} occurrences in file: {file_path}")
+        atomic_write_file(file_path, new_content, encoding, preserve_permissions=preserve_permissions,
+                          source_stat=st)
         
-        if permissions is not None:
-            set_file_permissions(file_path, permissions)
+        logger.debug("Successfully replaced %s occurrences in file: %s", num_replacements, file_path)
         
         return True, num_replacements
     except FileOperationError:
@@ -425,3 +908,157 @@ def replace_in_file(file_path: str, pattern: Union[str, Pattern[AnyStr]], replac
         logger.error(f"Error replacing content in file {file_path}: {str(e)}")
         raise FileOperationError(f"Error replacing content in file: {str(e)}", 
                                 file_path=file_path, operation="replace", cause=e)
+
+
+class EditableFile:
+    """A text file held in memory for several insertions, written back once.
+    
+    Positions are resolved against the file as it was read, so earlier
+    insertions do not shift the line numbers of later ones. Line starts are
+    indexed once on open; each insertion is then a lookup plus a sorted insert
+    into the pending edits, and the file is rewritten atomically on exit.
+    
+    Usage:
+        with open_editable(path) as editable:
+            editable.insert(1, "import os")
+            editable.insert("def main", "# entry point")
+    """
+    
+    def __init__(self, file_path: str, encoding: str = 'utf-8', preserve_permissions: bool = True):
+        """Initialize the editable file.
+        
+        Args:
+            file_path (str): Path to the file.
+            encoding (str): File encoding.
+            preserve_permissions (bool): Preserve file permissions on write-back.
+        """
+        self.file_path = file_path
+        self.encoding = encoding
+        self.preserve_permissions = preserve_permissions
+        self.text = ""
+        self.offsets: List[int] = []
+        self._edits: List[Tuple[int, int, str]] = []
+    
+    def __enter__(self) -> 'EditableFile':
+        self.text = read_file(self.file_path, self.encoding)
+        text = self.text
+        offsets = [0]
+        newline = text.find('\n')
+        while newline >= 0:
+            offsets.append(newline + 1)
+            newline = text.find('\n', newline + 1)
+        if offsets[-1] != len(text):
+            offsets.append(len(text))
+        self.offsets = offsets
+        self._edits = []
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.flush()
+    
+    def insert(self, position: Union[int, str, Pattern[AnyStr]], content: str, before: bool = True) -> None:
+        """Queues content for insertion, with the same positions as insert_into_file.
+        
+        Args:
+            position: Line number (int), string, or regex pattern in the original file.
+            content (str): Content to insert.
+            before (bool): Insert before (True) or after (False) the matched line.
+            
+        Raises:
+            FileOperationError: If the line number is invalid or the position is not found.
+        """
+        offsets = self.offsets
+        if isinstance(position, int):
+            if not 1 <= position <= len(offsets):
+                error_msg = f"Invalid line number: {position}, total lines: {len(offsets) - 1}"
+                logger.error(error_msg)
+                raise FileOperationError(error_msg, file_path=self.file_path, operation="insert")
+            offset = offsets[position - 1]
+        else:
+            if isinstance(position, Pattern):
+                match = _compile(position.pattern, position.flags | re.MULTILINE).search(self.text)
+                match_offset = match.start() if match else -1
+            else:
+                match_offset = self.text.find(position)
+            if match_offset < 0:
+                error_msg = f"String/pattern not found: {position}"
+                logger.error(error_msg)
+                raise FileOperationError(error_msg, file_path=self.file_path, operation="insert")
+            line_index = bisect.bisect_right(offsets, match_offset) - 1
+            if not before:
+                line_index += 1
+            offset = offsets[min(line_index, len(offsets) - 1)]
+        
+        new_content = content if content.endswith('\n') else content + '\n'
+        # The sequence number keeps insertions at the same offset in call order
+        bisect.insort(self._edits, (offset, len(self._edits), new_content))
+    
+    def flush(self) -> bool:
+        """Writes queued insertions back to the file in a single atomic write.
+        
+        Returns:
+            bool: True if the file was written, False if there was nothing to write.
+            
+        Raises:
+            FileOperationError: If unable to write to the file.
+        """
+        if not self._edits:
+            return False
+        encoder = codecs.getincrementalencoder(self.encoding)()
+        chunks = []
+        start = 0
+        for offset, _, content in self._edits:
+            chunks.append(encoder.encode(self.text[start:offset]))
+            chunks.append(encoder.encode(content))
+            start = offset
+        chunks.append(encoder.encode(self.text[start:], True))
+        atomic_write_file(self.file_path, chunks, preserve_permissions=self.preserve_permissions)
+        logger.debug("Flushed %s insertions into file: %s", len(self._edits), self.file_path)
+        self._edits = []
+        return True
+
+
+def open_editable(file_path: str, encoding: str = 'utf-8', preserve_permissions: bool = True) -> EditableFile:
+    """Opens a file for a batch of insertions that are written back once.
+    
+    Args:
+        file_path (str): Path to the file.
+        encoding (str): File encoding.
+        preserve_permissions (bool): Preserve file permissions on write-back.
+        
+    Returns:
+        EditableFile: Context manager that reads the file on entry and flushes on exit.
+    """
+    return EditableFile(file_path, encoding, preserve_permissions)
+
+
+async def aread_file(file_path: str, encoding: str = 'utf-8', errors: str = 'strict') -> str:
+    """Reads a file in a worker thread; see read_file.
+    
+    Only worthwhile when many reads are in flight at once (roughly eight or
+    more); a single awaited read is slower than calling read_file directly.
+    """
+    return await asyncio.to_thread(read_file, file_path, encoding, errors)
+
+
+async def awrite_file(file_path: str, content: str, encoding: str = 'utf-8', make_dirs: bool = True) -> bool:
+    """Writes a file in a worker thread; see write_file."""
+    return await asyncio.to_thread(write_file, file_path, content, encoding, make_dirs)
+
+
+async def read_many(file_paths: Iterable[str], encoding: str = 'utf-8', errors: str = 'strict') -> List[str]:
+    """Reads several files concurrently.
+    
+    Args:
+        file_paths: Paths of the files to read.
+        encoding (str): File encoding.
+        errors (str): Error handling for encoding issues.
+        
+    Returns:
+        List[str]: File contents, in the order of file_paths.
+        
+    Raises:
+        FileOperationError: If any of the files cannot be read.
+    """
+    return await asyncio.gather(*(aread_file(path, encoding, errors) for path in file_paths))
@@ -5,27 +5,87 @@ File Watcher for automatic indexing of new/modified files.
 import os
 import time
 import logging
-from typing import Set, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Callable, List, Optional
 from threading import Thread, Event
 from pathlib import Path
 
+from agentcli.core.text_search import get_gitignore_patterns
+
+try:
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
+try:
+    import pathspec
+    PATHSPEC_AVAILABLE = True
+except ImportError:
+    PATHSPEC_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Extensions of files that are indexed; a tuple so endswith checks them in one call
+_WATCH_EXT = ('.py', '.js', '.ts', '.md', '.json', '.yaml', '.yml', '.txt')
+
+
+class _WatchdogHandler:
+    """Forwards watchdog events to the owning FileWatcher."""
+    
+    def __init__(self, watcher: 'FileWatcher'):
+        self.watcher = watcher
+        
+    def dispatch(self, event):
+        """Handle a single watchdog event."""
+        if event.is_directory:
+            # Files inside a removed or renamed directory get no events of their own
+            if event.event_type == 'deleted':
+                self.watcher._dir_deleted(event.src_path)
+            elif event.event_type == 'moved':
+                self.watcher._dir_moved(event.src_path, event.dest_path)
+            return
+        if event.event_type == 'deleted':
+            self.watcher._file_deleted(event.src_path)
+        elif event.event_type == 'moved':
+            self.watcher._file_deleted(event.src_path)
+            self.watcher._file_changed(event.dest_path)
+        elif event.event_type in ('created', 'modified'):
+            self.watcher._file_changed(event.src_path)
+
 
 class FileWatcher:
-    """Watches for file changes and triggers indexing."""
+    """Watches for file changes and triggers indexing.
+    
+    Uses native filesystem notifications through watchdog when it is
+    installed, and falls back to polling the project tree otherwise.
+    """
     
     def __init__(self, project_path: str, on_file_change: Callable[[str], None]):
         self.project_path = project_path
         self.on_file_change = on_file_change
         self._stop_event = Event()
         self._watch_thread = None
-        self._last_scan_time = time.time()
-        self._known_files: Set[str] = set()
+        self._observer = None
+        # Watched file path -> st_mtime_ns as of the last scan or event
+        self._known_files: Dict[str, int] = {}
+        self._root_prefix = os.path.join(project_path, '')
+        self._ignore_spec = self._load_ignore_spec()
         
     def start(self):
         """Start file watching."""
         self._scan_initial_files()
+        if WATCHDOG_AVAILABLE:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_WatchdogHandler(self), self.project_path, recursive=True)
+                self._observer.start()
+                logger.info("File watcher started")
+                return
+            except Exception as e:
+                # e.g. the inotify watch limit is exhausted
+                logger.warning(f"Native file watching unavailable, falling back to polling: {e}")
+                self._observer = None
         self._watch_thread = Thread(target=self._watch_loop, daemon=True)
         self._watch_thread.start()
         logger.info("File watcher started")
@@ -33,24 +93,140 @@ class FileWatcher:
     def stop(self):
         """Stop file watching."""
         self._stop_event.set()
+        if self._observer:
+            self._observer.stop()
+            self._observer.join(timeout=1.0)
+            self._observer = None
         if self._watch_thread:
             self._watch_thread.join(timeout=1.0)
         logger.info("File watcher stopped")
         
     def _scan_initial_files(self):
-        """Scan initial files."""
-        for root, dirs, files in os.walk(self.project_path):
-            dirs[:] = [d for d in dirs if not d.startswith('.') and d != '__pycache__']
-            
-            for file in files:
-                if self._should_watch_file(file):
-                    file_path = os.path.join(root, file)
-                    self._known_files.add(file_path)
+        """Scan initial files, walking the top-level directories in parallel."""
+        subdirs: List[str] = []
+        known_files = self._scan_tree(self.project_path, subdirs)
+        if len(subdirs) < 2:
+            for subdir in subdirs:
+                known_files.update(self._scan_tree(subdir))
+        else:
+            # scandir and stat release the GIL, so subtrees are listed concurrently
+            with ThreadPoolExecutor(max_workers=min(8, len(subdirs))) as pool:
+                for files in pool.map(self._scan_tree, subdirs):
+                    known_files.update(files)
+        self._known_files.update(known_files)
+        
+    def _scan_tree(self, root: str, subdirs: Optional[List[str]] = None) -> Dict[str, int]:
+        """Map watched files under root to their st_mtime_ns."""
+        files: Dict[str, int] = {}
+        for entry in self._iter_watched_files(root, subdirs):
+            try:
+                files[entry.path] = entry.stat().st_mtime_ns
+            except OSError:
+                continue
+        return files
                     
+    def _load_ignore_spec(self):
+        """Build a matcher for the project's .gitignore, if pathspec is installed."""
+        if not PATHSPEC_AVAILABLE:
+            return None
+        patterns = get_gitignore_patterns(self.project_path)
+        if not patterns:
+            return None
+        return pathspec.PathSpec.from_lines('gitwildmatch', patterns)
+        
+    def _is_ignored(self, path: str, is_dir: bool = False) -> bool:
+        """Check a path under the project against .gitignore."""
+        if self._ignore_spec is None:
+            return False
+        if path.startswith(self._root_prefix):
+            rel_path = path[len(self._root_prefix):]
+        else:
+            rel_path = os.path.relpath(path, self.project_path)
+        rel_path = rel_path.replace(os.sep, '/')
+        return self._ignore_spec.match_file(rel_path + '/' if is_dir else rel_path)
+        
+    def _iter_watched_files(self, root: Optional[str] = None, subdirs: Optional[List[str]] = None):
+        """Yield DirEntry objects for watched files under root (the project path by default).
+        
+        When subdirs is given, directories are collected into it instead of
+        being descended into.
+        """
+        pending = [root or self.project_path]
+        descend = pending if subdirs is None else subdirs
+        while pending:
+            try:
+                with os.scandir(pending.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            # Like os.walk, symlinked directories are not descended into
+                            if (not entry.is_symlink() and self._should_watch_dir(entry.name)
+                                    and not self._is_ignored(entry.path, is_dir=True)):
+                                descend.append(entry.path)
+                        elif self._should_watch_file(entry.name) and not self._is_ignored(entry.path):
+                            yield entry
+            except OSError:
+                continue
+        
+    def _should_watch_dir(self, dirname: str) -> bool:
+        """Check if directory should be descended into."""
+        return not dirname.startswith('.') and dirname != '__pycache__'
+        
     def _should_watch_file(self, filename: str) -> bool:
         """Check if file should be watched."""
-        extensions = {'.py', '.js', '.ts', '.md', '.json', '.yaml', '.yml', '.txt'}
-        return any(filename.endswith(ext) for ext in extensions)
+        return filename.endswith(_WATCH_EXT)
+        
+    def _should_watch_path(self, file_path: str) -> bool:
+        """Check if a file reported by an event should be watched."""
+        rel_dir, filename = os.path.split(os.path.relpath(file_path, self.project_path))
+        if not self._should_watch_file(filename):
+            return False
+        if rel_dir and not all(self._should_watch_dir(part) for part in rel_dir.split(os.sep)):
+            return False
+        return not self._is_ignored(file_path)
+        
+    def _file_changed(self, file_path: str):
+        """Handle a created or modified file reported by watchdog."""
+        if not self._should_watch_path(file_path):
+            return
+        try:
+            mtime = os.stat(file_path).st_mtime_ns
+        except OSError:
+            return
+        known_mtime = self._known_files.get(file_path)
+        if known_mtime == mtime:
+            # Editors often emit several events for a single save
+            return
+        self._known_files[file_path] = mtime
+        if known_mtime is None:
+            logger.info(f"New file detected: {file_path}")
+        else:
+            logger.info(f"Modified file detected: {file_path}")
+        try:
+            self.on_file_change(file_path)
+        except Exception as e:
+            logger.error(f"File watcher error: {e}")
+        
+    def _file_deleted(self, file_path: str):
+        """Handle a deleted file reported by watchdog."""
+        if self._known_files.pop(file_path, None) is not None:
+            self._handle_deleted_file(file_path)
+        
+    def _dir_deleted(self, dir_path: str):
+        """Handle a deleted directory reported by watchdog."""
+        prefix = os.path.join(dir_path, '')
+        for file_path in [path for path in self._known_files if path.startswith(prefix)]:
+            self._file_deleted(file_path)
+        
+    def _dir_moved(self, src_path: str, dest_path: str):
+        """Handle a renamed directory reported by watchdog."""
+        self._dir_deleted(src_path)
+        for file_path in self._scan_tree(dest_path):
+            self._file_changed(file_path)
+        
+    def _handle_deleted_file(self, file_path: str):
+        """Handle a watched file that no longer exists, however it was detected."""
+        logger.info(f"Deleted file detected: {file_path}")
+        # TODO: Remove from ChromaDB
         
     def _watch_loop(self):
         """Main watching loop."""
@@ -63,29 +239,29 @@ class FileWatcher:
                 
     def _check_for_changes(self):
         """Check for file changes."""
-        current_files = set()
+        current_files: Dict[str, int] = {}
         
-        for root, dirs, files in os.walk(self.project_path):
-            dirs[:] = [d for d in dirs if not d.startswith('.') and d != '__pycache__']
+        for entry in self._iter_watched_files():
+            file_path = entry.path
+            try:
+                mtime = entry.stat().st_mtime_ns
+            except OSError:
+                # Removed between listing and stat; reported as deleted below
+                continue
+            current_files[file_path] = mtime
             
-            for file in files:
-                if self._should_watch_file(file):
-                    file_path = os.path.join(root, file)
-                    current_files.add(file_path)
-                    
-                    # Check if file is new or modified
-                    if file_path not in self._known_files:
-                        logger.info(f"New file detected: {file_path}")
-                        self.on_file_change(file_path)
-                    elif os.path.getmtime(file_path) > self._last_scan_time:
-                        logger.info(f"Modified file detected: {file_path}")
-                        self.on_file_change(file_path)
+            # Check if file is new or modified
+            known_mtime = self._known_files.get(file_path)
+            if known_mtime is None:
+                logger.info(f"New file detected: {file_path}")
+                self.on_file_change(file_path)
+            elif known_mtime != mtime:
+                logger.info(f"Modified file detected: {file_path}")
+                self.on_file_change(file_path)
         
         # Detect deleted files
-        deleted_files = self._known_files - current_files
+        deleted_files = self._known_files.keys() - current_files.keys()
         for deleted_file in deleted_files:
-            logger.info(f"Deleted file detected: {deleted_file}")
-            # TODO: Remove from ChromaDB
+            self._handle_deleted_file(deleted_file)
             
         self._known_files = current_files
-        self._last_scan_time = time.time()
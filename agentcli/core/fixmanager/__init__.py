@@ -1,4 +1,4 @@
-from .models import FileContext, ModuleContext, ProjectContext
+from .models import FileContext, ImportInfo, ModuleContext, ProjectContext
 from .dependency_analyzer import DependencyAnalyzer
 from .structure_analyzer import ModuleStructureAnalyzer
 from .context_builder import ContextBuilder
@@ -6,7 +6,7 @@ from .fix_manager import FixManager
 
 __all__ = [
     'FixManager',
-    'FileContext', 'ModuleContext', 'ProjectContext',
+    'FileContext', 'ImportInfo', 'ModuleContext', 'ProjectContext',
     'DependencyAnalyzer', 'ModuleStructureAnalyzer', 
     'ContextBuilder'
 ]
\ No newline at end of file
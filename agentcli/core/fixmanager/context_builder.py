@@ -1,40 +1,68 @@
+import fnmatch
+import os
 import re
 from pathlib import Path
-from typing import Dict, List, Set, Tuple, Any
-from collections import defaultdict, deque
+from typing import Dict, List, Optional, Tuple, Any
+from collections import defaultdict
 
 from .models import FileContext, ModuleContext, ProjectContext
 from .dependency_analyzer import DependencyAnalyzer
 from .structure_analyzer import ModuleStructureAnalyzer
 
+# File name patterns, matched the way pathlib.glob matches them on this platform
+_GLOB_FLAGS = re.IGNORECASE if os.path.normcase('A') == 'a' else 0
+CONFIG_FILE_PATTERNS = [re.compile(fnmatch.translate(pattern), _GLOB_FLAGS) for pattern in (
+    '*.json', '*.yaml', '*.yml', '*.toml', '*.ini',
+    'config.py', 'settings.py', '.env*', 'requirements*.txt'
+)]
+TEST_FILE_PATTERNS = [re.compile(fnmatch.translate(pattern), _GLOB_FLAGS) for pattern in (
+    'test_*.py', '*_test.py'
+)]
+PY_FILE_PATTERN = re.compile(fnmatch.translate('*.py'), _GLOB_FLAGS)
+# How many config and test files the context lists
+MAX_CONFIG_FILES = 20
+MAX_TEST_FILES = 30
+# Directories never searched for project files, in addition to hidden ones
+SKIP_DIRS = frozenset({
+    'node_modules', 'venv', '.venv', '__pycache__', '.mypy_cache',
+    '.pytest_cache', 'build', 'dist', '.tox', '.git'
+})
+# Architecture patterns: each needs a module from every one of its name groups
+ARCHITECTURE_PATTERNS = [
+    ((frozenset({'models'}), frozenset({'views'})), 'MVC-like structure'),
+    ((frozenset({'services', 'handlers'}),), 'Service layer pattern'),
+    ((frozenset({'utils', 'helpers'}),), 'Utility modules'),
+    ((frozenset({'config', 'settings'}),), 'Configuration management'),
+]
+
 class ContextBuilder:
     """Builds full project context for LLM."""
     
-    def __init__(self, root_path: Path):
+    def __init__(self, root_path: Path, use_scan_cache: bool = True):
         self.root_path = root_path
         self.dependency_analyzer = DependencyAnalyzer(root_path)
-        self.module_analyzer = ModuleStructureAnalyzer(root_path)
+        self.module_analyzer = ModuleStructureAnalyzer(root_path, self.dependency_analyzer, use_scan_cache)
         
     def build_full_context(self, target_files: List[Path]) -> ProjectContext:
-        # 1. Находим все релевантные файлы
-        relevant_files = self._find_relevant_files(target_files)
+        # Файлы могли измениться с прошлой сборки
+        self.dependency_analyzer.clear_cache()
         
-        # 2. Анализируем каждый файл
-        file_contexts = []
-        for file_path in relevant_files:
-            file_ctx = self.module_analyzer._analyze_single_file(file_path)
-            if file_ctx:
-                file_contexts.append(file_ctx)
+        # 1-2. Находим все релевантные файлы и анализируем каждый
+        relevant_files = self._find_relevant_files(target_files)
+        file_contexts = [file_ctx for file_ctx in relevant_files.values() if file_ctx]
+        if self.module_analyzer.scan_cache:
+            self.module_analyzer.scan_cache.prune()
         
         # 3. Строим граф зависимостей
         dependency_graph = self.dependency_analyzer.build_dependency_graph(file_contexts)
         
-        # 4. Заполняем dependents
+        # 4. Заполняем dependents по обратному графу, построенному за один проход
+        reverse_graph = defaultdict(set)
+        for other_file, deps in dependency_graph.items():
+            for dep in deps:
+                reverse_graph[dep].add(other_file)
         for file_ctx in file_contexts:
-            file_path = str(file_ctx.path)
-            for other_file, deps in dependency_graph.items():
-                if file_path in deps:
-                    file_ctx.dependents.add(other_file)
+            file_ctx.dependents.update(reverse_graph.get(str(file_ctx.path), ()))
         
         # 5. Группируем по модулям
         modules = self._group_files_by_modules(file_contexts)
@@ -42,12 +70,12 @@ class ContextBuilder:
         # 6. Строим карты импортов и символов
         import_map, global_symbols = self._build_symbol_maps(file_contexts)
         
-        # 7. Выявляем архитектурные паттерны
-        patterns = self._detect_architecture_patterns(modules, dependency_graph)
+        # 7. Ищем циклы и выявляем архитектурные паттерны
+        cycles = self.dependency_analyzer.find_circular_dependencies(dependency_graph)
+        patterns = self._detect_architecture_patterns(modules, cycles)
         
         # 8. Находим конфигурационные и тестовые файлы
-        config_files = self._find_config_files()
-        test_files = self._find_test_files()
+        config_files, test_files = self._find_project_files()
         
         return ProjectContext(
             root_path=self.root_path,
@@ -57,66 +85,69 @@ class ContextBuilder:
             global_symbols=global_symbols,
             architecture_patterns=patterns,
             config_files=config_files,
-            test_files=test_files
+            test_files=test_files,
+            cycles=cycles
         )
     
-    def _find_relevant_files(self, target_files: List[Path], max_depth: int = 3) -> Set[Path]:
-        relevant = set()
-        queue = deque([(f, 0) for f in target_files])
-        visited = set()
+    def _find_relevant_files(self, target_files: List[Path], max_depth: int = 3) -> Dict[Path, Optional[FileContext]]:
+        """Maps each relevant file to its analysis, or None if it could not be analyzed.
         
-        while queue:
-            current_file, depth = queue.popleft()
-            
-            if current_file in visited or depth > max_depth:
-                continue
-                
-            visited.add(current_file)
-            relevant.add(current_file)
+        Files are analyzed one dependency level at a time, so the
+        dependencies followed by the search come from the same analysis
+        instead of parsing every file twice.
+        """
+        relevant = {}
+        # Уже найденные файлы как строки: Path создаем только для новых
+        seen = set()
+        level = []
+        for file_path in target_files:
+            if str(file_path) not in seen:
+                seen.add(str(file_path))
+                level.append(file_path)
+        
+        for _ in range(max_depth + 1):
+            if not level:
+                break
+            file_contexts = self.module_analyzer.analyze_files(level)
+            relevant.update(zip(level, file_contexts))
             
-            # Находим зависимости и зависимых
-            if current_file.exists() and current_file.suffix == '.py':
-                try:
-                    content = current_file.read_text(encoding='utf-8')
-                    _, dependencies = self.dependency_analyzer.analyze_file_imports(current_file, content)
-                    
-                    for dep_path_str in dependencies:
-                        dep_path = Path(dep_path_str)
-                        if dep_path not in visited:
-                            queue.append((dep_path, depth + 1))
-                            
-                except (UnicodeDecodeError, PermissionError):
-                    continue
+            # Следующий уровень: зависимости Python-файлов этого уровня
+            next_level = []
+            for file_path, file_ctx in zip(level, file_contexts):
+                if file_ctx and file_path.suffix == '.py':
+                    for dep_path_str in file_ctx.dependencies:
+                        if dep_path_str not in seen:
+                            seen.add(dep_path_str)
+                            next_level.append(Path(dep_path_str))
+            level = next_level
         
         return relevant
     
     def _group_files_by_modules(self, file_contexts: List[FileContext]) -> Dict[str, ModuleContext]:
         modules = {}
         
-        # Группируем по директориям
-        dirs_to_files = defaultdict(list)
+        # Группируем по директориям (ключ - строка пути, так дешевле хешировать)
+        dirs_to_files: Dict[str, List[FileContext]] = {}
         for file_ctx in file_contexts:
-            parent_dir = file_ctx.path.parent
-            dirs_to_files[parent_dir].append(file_ctx)
+            parent_dir = os.path.dirname(str(file_ctx.path)) or os.curdir
+            dirs_to_files.setdefault(parent_dir, []).append(file_ctx)
         
         # Создаем контексты модулей
-        for dir_path, files in dirs_to_files.items():
+        root_str = str(self.root_path)
+        for dir_str, files in dirs_to_files.items():
+            dir_path = Path(dir_str)
             module_name = dir_path.name
-            if dir_path == self.root_path:
+            if dir_str == root_str:
                 module_name = "root"
                 
-            # Анализируем зависимости модуля
+            # Анализируем зависимости модуля; все они уже разрешены в файлы проекта
             internal_deps = set()
             external_deps = set()
             
             for file_ctx in files:
                 for dep in file_ctx.dependencies:
-                    dep_path = Path(dep)
-                    if dep_path.is_relative_to(self.root_path):
-                        if dep_path.parent != dir_path:
-                            internal_deps.add(dep)
-                    else:
-                        external_deps.add(dep)
+                    if (os.path.dirname(dep) or os.curdir) != dir_str:
+                        internal_deps.add(dep)
             
             # Публичное API
             public_api = []
@@ -155,60 +186,79 @@ class ContextBuilder:
                 
             # Строим карту импортов (модуль -> файл)
             for imp in file_ctx.imports:
-                if imp.startswith('from '):
-                    match = re.match(r'from\s+([^\s]+)\s+import', imp)
-                    if match:
-                        module_name = match.group(1)
-                        import_map[module_name] = file_path
-                elif imp.startswith('import '):
-                    module_name = imp.split()[1].split('.')[0]
-                    import_map[module_name] = file_path
+                if imp.kind == 'from':
+                    import_map[imp.module] = file_path
+                else:
+                    import_map[imp.module.split('.')[0]] = file_path
         
         return import_map, global_symbols
     
     def _detect_architecture_patterns(self, modules: Dict[str, ModuleContext], 
-                                    dependency_graph: Dict[str, Set[str]]) -> List[str]:
-        patterns = []
-        
-        module_names = set(modules.keys())
-        
-        if 'models' in module_names and 'views' in module_names:
-            patterns.append('MVC-like structure')
-            
-        if 'services' in module_names or 'handlers' in module_names:
-            patterns.append('Service layer pattern')
-            
-        if 'utils' in module_names or 'helpers' in module_names:
-            patterns.append('Utility modules')
-            
-        if 'config' in module_names or 'settings' in module_names:
-            patterns.append('Configuration management')
+                                    cycles: List[List[str]]) -> List[str]:
+        patterns = [label for groups, label in ARCHITECTURE_PATTERNS
+                    if all(any(name in modules for name in group) for group in groups)]
         
-        cycles = self.dependency_analyzer.find_circular_dependencies(dependency_graph)
         if cycles:
             patterns.append(f'Circular dependencies detected: {len(cycles)} cycles')
         
         return patterns
     
-    def _find_config_files(self) -> List[Path]:
-        config_patterns = [
-            '**/*.json', '**/*.yaml', '**/*.yml', '**/*.toml', '**/*.ini',
-            '**/config.py', '**/settings.py', '**/.env*', '**/requirements*.txt'
-        ]
-        
-        config_files = []
-        for pattern in config_patterns:
-            config_files.extend(self.root_path.glob(pattern))
-            
-        return config_files[:20]  
-    
-    def _find_test_files(self) -> List[Path]:
-        test_patterns = [
-            '**/test_*.py', '**/*_test.py', '**/tests/**/*.py'
-        ]
-        
-        test_files = []
-        for pattern in test_patterns:
-            test_files.extend(self.root_path.glob(pattern))
+    def _find_project_files(self) -> Tuple[List[Path], List[Path]]:
+        """Finds config and test files in a single walk of the project.
+        
+        Hidden directories and those in SKIP_DIRS are not descended into.
+        Files are listed in the order separate '**/<pattern>' globs would
+        produce them, one pattern after another.
+        """
+        config_matches = [[] for _ in CONFIG_FILE_PATTERNS]
+        test_matches = [[] for _ in TEST_FILE_PATTERNS]
+        # '**/tests/**/*.py' lists each tests/ tree when it reaches the tree's
+        # parent, so .py files are grouped under their outermost tests/ directory
+        tests_dir_groups = []
+        
+        # Обход в прямом порядке, как у pathlib.glob('**/...')
+        pending = [(self.root_path, None, False)]
+        while pending:
+            dir_path, tests_group, tests_only = pending.pop()
+            try:
+                with os.scandir(dir_path) as entries:
+                    entries = list(entries)
+            except OSError:
+                continue
+            subdirs = []
+            for entry in entries:
+                name = entry.name
+                if not tests_only:
+                    for matches, pattern in zip(config_matches, CONFIG_FILE_PATTERNS):
+                        if pattern.match(name):
+                            matches.append(dir_path / name)
+                    for matches, pattern in zip(test_matches, TEST_FILE_PATTERNS):
+                        if pattern.match(name):
+                            matches.append(dir_path / name)
+                if tests_group is not None and PY_FILE_PATTERN.match(name):
+                    tests_group.append(dir_path / name)
+                if name in SKIP_DIRS or name.startswith('.'):
+                    # Скрытые файлы (.env*) проверены выше, в каталоги не заходим
+                    continue
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    # Like glob, a symlinked tests/ directory is still listed
+                    is_tests_dir = (not tests_only and os.path.normcase(name) == 'tests'
+                                    and (is_dir or entry.is_dir()))
+                except OSError:
+                    continue
+                if is_tests_dir and (tests_group is None or not is_dir):
+                    tests_dir_groups.append([])
+                    subdirs.append((dir_path / name, tests_dir_groups[-1], not is_dir))
+                elif is_dir:
+                    subdirs.append((dir_path / name, tests_group, tests_only))
+            pending.extend(reversed(subdirs))
             
-        return test_files[:30]
\ No newline at end of file
+            # Списки склеиваются по шаблонам, так что когда первый шаблон уже дал
+            # нужное число файлов, дальнейший обход результат не изменит
+            if len(config_matches[0]) >= MAX_CONFIG_FILES and len(test_matches[0]) >= MAX_TEST_FILES:
+                break
+        
+        config_files = [path for matches in config_matches for path in matches]
+        test_files = [path for matches in test_matches + tests_dir_groups for path in matches]
+        return config_files[:MAX_CONFIG_FILES], test_files[:MAX_TEST_FILES]
\ No newline at end of file
@@ -1,50 +1,125 @@
 import ast
+import functools
+import os
 import re
 from pathlib import Path
-from typing import Dict, List, Set, Optional, Tuple
-from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Set, Optional, Tuple
+from collections import defaultdict, deque
 
-from .models import FileContext
+from .models import FileContext, ImportInfo
+
+IMPORT_PATTERNS = [
+    re.compile(r'^from\s+([a-zA-Z_][a-zA-Z0-9_.]*)\s+import\s+(.+)$'),
+    re.compile(r'^import\s+([a-zA-Z_][a-zA-Z0-9_.]*(?:\s*,\s*[a-zA-Z_][a-zA-Z0-9_.]*)*)$'),
+]
+
+# Parsed trees kept for files seen again within the session
+PARSE_CACHE_SIZE = 512
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_source(content: str) -> ast.AST:
+    """Parses module source, reusing the tree if the same source was parsed before.
+    
+    The returned tree is shared between callers and must not be modified.
+    """
+    return compile(content, '<unknown>', 'exec', ast.PyCF_ONLY_AST)
+
+# Nodes that can hold statements; expressions never contain statements
+_STATEMENT_CONTAINERS = (ast.stmt, ast.excepthandler, ast.match_case)
+
+def walk_statements(tree: ast.AST) -> Iterator[ast.AST]:
+    """Yields the statements of a tree in ast.walk order, skipping expressions.
+    
+    Except handlers and match cases are yielded too, as statements are
+    nested inside them.
+    """
+    todo = deque([tree])
+    while todo:
+        node = todo.popleft()
+        todo.extend(child for child in ast.iter_child_nodes(node) if isinstance(child, _STATEMENT_CONTAINERS))
+        yield node
+
+def collect_imports(import_nodes: Iterable[ast.AST]) -> List[ImportInfo]:
+    """Converts Import and ImportFrom nodes to ImportInfo records, in order."""
+    imports = []
+    for node in import_nodes:
+        if isinstance(node, ast.Import):
+            imports.extend(ImportInfo('import', alias.name) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            imports.append(ImportInfo('from', node.module, tuple(alias.name for alias in node.names)))
+    return imports
 
 class DependencyAnalyzer:
     """Dependency analyzer between files and modules."""
     
     def __init__(self, root_path: Path):
         self.root_path = root_path
-        self.import_patterns = [
-            r'^from\s+([a-zA-Z_][a-zA-Z0-9_.]*)\s+import\s+(.+)$',
-            r'^import\s+([a-zA-Z_][a-zA-Z0-9_.]*(?:\s*,\s*[a-zA-Z_][a-zA-Z0-9_.]*)*)$',
-        ]
+        self.import_patterns = IMPORT_PATTERNS
+        self._root_str = str(root_path)
+        # Корень с разделителем на конце; у Path('.') частей нет, и в проекте любой относительный путь
+        self._root_prefix = os.path.join(self._root_str, '') if root_path.parts else ''
+        # Directory listings and resolved imports, reused until clear_cache()
+        self._dir_listings: Dict[str, Set[str]] = {}
+        self._resolved_imports: Dict[Tuple[str, Optional[Path]], Optional[Path]] = {}
     
-    def analyze_file_imports(self, file_path: Path, content: str) -> Tuple[List[str], Set[str]]:
-        imports = []
-        dependencies = set()
+    def clear_cache(self):
+        """Forgets cached directory listings, e.g. before analyzing a changed tree."""
+        self._dir_listings.clear()
+        self._resolved_imports.clear()
+    
+    def is_project_path(self, path: str) -> bool:
+        """Tells whether a normalized path string is inside the project root.
         
+        Same as Path(path).is_relative_to(root_path), using string prefix
+        checks instead of building Path objects.
+        """
+        if not self._root_prefix:
+            return not os.path.isabs(path)
+        return path.startswith(self._root_prefix) or path == self._root_str
+    
+    def analyze_file_imports(self, file_path: Path, content: str) -> Tuple[List[ImportInfo], Set[str]]:
+        # Любой импорт содержит слово import, без него разбирать файл незачем
+        if 'import' not in content:
+            return [], set()
         try:
-            tree = ast.parse(content)
+            tree = parse_source(content)
         except SyntaxError:
-            return imports, dependencies
+            return [], set()
             
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Import):
-                for alias in node.names:
-                    imports.append(f"import {alias.name}")
-                    dep_file = self._resolve_import_to_file(alias.name, file_path)
-                    if dep_file:
-                        dependencies.add(str(dep_file))
-                        
-            elif isinstance(node, ast.ImportFrom):
-                if node.module:
-                    import_names = [alias.name for alias in node.names]
-                    imports.append(f"from {node.module} import {', '.join(import_names)}")
-                    dep_file = self._resolve_import_to_file(node.module, file_path)
-                    if dep_file:
-                        dependencies.add(str(dep_file))
+        import_nodes = (node for node in walk_statements(tree) if isinstance(node, (ast.Import, ast.ImportFrom)))
+        return self.resolve_imports(file_path, import_nodes)
+    
+    def resolve_imports(self, file_path: Path, import_nodes: Iterable[ast.AST]) -> Tuple[List[ImportInfo], Set[str]]:
+        """Collects import statements and resolves them to project files."""
+        imports = collect_imports(import_nodes)
+        return imports, self.resolve_dependencies(file_path, imports)
+    
+    def resolve_dependencies(self, file_path: Path, imports: Iterable[ImportInfo]) -> Set[str]:
+        """Resolves a file's imports to the project files they refer to.
         
-        return imports, dependencies
+        Only imports that resolve to files inside the project root become
+        dependencies, so every dependency is an internal one.
+        """
+        dependencies = set()
+        for imp in imports:
+            dep_file = self._resolve_import_to_file(imp.module, file_path)
+            if dep_file:
+                dependencies.add(str(dep_file))
+        return dependencies
     
     def _resolve_import_to_file(self, module_name: str, current_file: Path) -> Optional[Path]:
         """Resolves import name to file path."""
+        # Only relative imports depend on where the importing file is
+        key = (module_name, current_file.parent if module_name.startswith('.') else None)
+        try:
+            return self._resolved_imports[key]
+        except KeyError:
+            pass
+        resolved = self._find_module_file(module_name, current_file)
+        self._resolved_imports[key] = resolved
+        return resolved
+    
+    def _find_module_file(self, module_name: str, current_file: Path) -> Optional[Path]:
         # Relative imports
         if module_name.startswith('.'):
             base_dir = current_file.parent
@@ -55,40 +130,45 @@ class DependencyAnalyzer:
             # Traverse up the hierarchy for each dot
             for _ in range(len(module_name) - len(module_name.lstrip('.'))):
                 base_dir = base_dir.parent
-                
-            target_path = base_dir
-            for part in module_parts:
-                target_path = target_path / part
-                
-            # Check different candidates
-            candidates = [
-                target_path.with_suffix('.py'),
-                target_path / '__init__.py',
-            ]
             
-            for candidate in candidates:
-                if candidate.exists() and candidate.is_relative_to(self.root_path):
-                    return candidate
+            for candidate in self._module_candidates(base_dir, module_parts):
+                if self._exists(candidate):
+                    candidate_path = Path(candidate)
+                    if self.is_project_path(str(candidate_path)):
+                        return candidate_path
         
         # Absolute imports inside the project
         else:
-            module_parts = module_name.split('.')
-            target_path = self.root_path
-            
-            for part in module_parts:
-                target_path = target_path / part
-                
-            candidates = [
-                target_path.with_suffix('.py'),
-                target_path / '__init__.py',
-            ]
-            
-            for candidate in candidates:
-                if candidate.exists():
-                    return candidate
+            for candidate in self._module_candidates(self.root_path, module_name.split('.')):
+                if self._exists(candidate):
+                    return Path(candidate)
                     
         return None
     
+    def _module_candidates(self, base_dir: Path, module_parts: List[str]) -> Tuple[str, str]:
+        """Returns the module file and package __init__.py paths for a module."""
+        if not module_parts:
+            # Path.with_suffix заменяет расширение в имени самой директории
+            return str(base_dir.with_suffix('.py')), os.path.join(str(base_dir), '__init__.py')
+        target_path = os.path.join(str(base_dir), *module_parts)
+        return target_path + '.py', os.path.join(target_path, '__init__.py')
+    
+    def _exists(self, path: str) -> bool:
+        """Checks for a path in its parent's cached listing instead of stat'ing it."""
+        dir_path, name = os.path.split(path)
+        return name in self._list_dir(dir_path)
+    
+    def _list_dir(self, dir_path: str) -> Set[str]:
+        names = self._dir_listings.get(dir_path)
+        if names is None:
+            try:
+                with os.scandir(dir_path or os.curdir) as entries:
+                    names = {entry.name for entry in entries}
+            except OSError:
+                names = set()
+            self._dir_listings[dir_path] = names
+        return names
+    
     def build_dependency_graph(self, files: List[FileContext]) -> Dict[str, Set[str]]:
         graph = defaultdict(set)
         
@@ -99,33 +179,53 @@ class DependencyAnalyzer:
         return dict(graph)
     
     def find_circular_dependencies(self, graph: Dict[str, Set[str]]) -> List[List[str]]:
+        """Finds groups of mutually dependent files.
+        
+        Runs Tarjan's strongly connected components algorithm iteratively, so
+        it is linear in the size of the graph and not limited by recursion depth.
+        Each component of more than one file, or a file importing itself, is
+        reported as one cycle.
+        """
         cycles = []
-        visited = set()
-        rec_stack = set()
-        path = []
+        index = {}
+        lowlink = {}
+        stack = []
+        on_stack = set()
         
-        def dfs(node):
-            if node in rec_stack:
-                # Найден цикл
-                cycle_start = path.index(node)
-                cycles.append(path[cycle_start:] + [node])
-                return
-                
-            if node in visited:
-                return
-                
-            visited.add(node)
-            rec_stack.add(node)
-            path.append(node)
-            
-            for neighbor in graph.get(node, set()):
-                dfs(neighbor)
-                
-            rec_stack.remove(node)
-            path.pop()
+        for root in graph:
+            if root in index:
+                continue
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            frames = [(root, iter(graph.get(root, ())))]
             
-        for node in graph:
-            if node not in visited:
-                dfs(node)
+            while frames:
+                node, neighbors = frames[-1]
+                for neighbor in neighbors:
+                    if neighbor not in index:
+                        index[neighbor] = lowlink[neighbor] = len(index)
+                        stack.append(neighbor)
+                        on_stack.add(neighbor)
+                        frames.append((neighbor, iter(graph.get(neighbor, ()))))
+                        break
+                    if neighbor in on_stack:
+                        lowlink[node] = min(lowlink[node], index[neighbor])
+                else:
+                    # Все соседи обработаны
+                    frames.pop()
+                    if frames:
+                        parent = frames[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        if len(component) > 1 or node in graph.get(node, ()):
+                            cycles.append(component)
                 
         return cycles
\ No newline at end of file
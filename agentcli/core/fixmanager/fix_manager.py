@@ -1,7 +1,8 @@
 import ast
-import re
+import io
+import os
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 
 from agentcli.core.logger import Logger
 from agentcli.utils.logging import logger as app_logger
@@ -9,6 +10,24 @@ from agentcli.core.planner import Planner
 
 from .models import ProjectContext
 from .context_builder import ContextBuilder
+from .structure_analyzer import _EXTRA_LINE_BREAKS
+
+def _iter_from_lines(content: str) -> Iterator[Tuple[int, int]]:
+    """Yields start and end offsets of the lines of newline-separated text that start with 'from '."""
+    start = 0
+    if not content.startswith('from '):
+        start = content.find('\nfrom ') + 1
+        if not start:
+            return
+    while True:
+        end = content.find('\n', start)
+        if end < 0:
+            yield start, len(content)
+            return
+        yield start, end
+        start = content.find('\nfrom ', end) + 1
+        if not start:
+            return
 
 class FixManager:
     def __init__(self, root_path: Path, llm_service, logger=None):
@@ -16,6 +35,9 @@ class FixManager:
         self.llm_service = llm_service
         self.context_builder = ContextBuilder(root_path)
         self.logger = logger or Logger()
+        # Найденные замены модулей по последней части имени, для карты импортов _similar_modules_map
+        self._similar_modules_map = None
+        self._similar_modules: Dict[str, Optional[str]] = {}
         app_logger.info(f"FixManager initialized for {self.root_path}")
 
     def fix_with_context(self, description: str, target_paths: List[Path], options: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -68,42 +90,50 @@ class FixManager:
 
     def _prepare_llm_context(self, project_context: ProjectContext, 
                              target_paths: List[Path], description: str) -> str:
-        context_parts = []
+        # Части разделяются переводом строки: его добавляет print, последняя часть пишется через write
+        context = io.StringIO()
 
-        context_parts.append(f"""
+        print(f"""
 # PROJECT: {project_context.root_path.name}
 
 ## ARCHITECTURE PATTERNS
 {chr(10).join(project_context.architecture_patterns) if project_context.architecture_patterns else "No patterns detected"}
 
 ## MODULE STRUCTURE
-""")
+""", file=context)
 
         for name, module in project_context.modules.items():
-            context_parts.append(f"""
+            print(f"""
 ### Module: {name}
 - Path: {module.path}
 - Files: {len(module.files)}
 - Public API: {', '.join(module.public_api[:10])}{'...' if len(module.public_api) > 10 else ''}
 - External dependencies: {len(module.external_dependencies)}
-""")
+""", file=context)
+
+        print("\n## TARGET FILES (detailed)\n", file=context)
 
-        context_parts.append("\n## TARGET FILES (detailed)\n")
+        # Для каждого модуля: путь файла или его директории -> первый такой файл модуля
+        module_file_indexes = []
+        for module in project_context.modules.values():
+            file_index = {}
+            for file_ctx in module.files:
+                path_str = str(file_ctx.path)
+                file_index.setdefault(os.path.normcase(path_str), file_ctx)
+                file_index.setdefault(os.path.normcase(os.path.dirname(path_str) or os.curdir), file_ctx)
+            module_file_indexes.append(file_index)
 
         for target_path in target_paths:
-            for module in project_context.modules.values():
-                target_file = None
-                for file_ctx in module.files:
-                    if file_ctx.path == target_path or target_path in [file_ctx.path, file_ctx.path.parent]:
-                        target_file = file_ctx
-                        break
+            target_key = os.path.normcase(str(target_path))
+            for file_index in module_file_indexes:
+                target_file = file_index.get(target_key)
 
                 if target_file:
-                    context_parts.append(f"""
+                    print(f"""
 ### {target_file.path.name}
 ```python
 # Imports:
-{chr(10).join(target_file.imports)}
+{chr(10).join(map(str, target_file.imports))}
 
 # Exports: {', '.join(target_file.exports)}
 # Dependencies: {len(target_file.dependencies)} files
@@ -112,48 +142,53 @@ class FixManager:
 # Lines of code: {target_file.line_count}
 
 # Content (first 50 lines):
-{chr(10).join(target_file.content.splitlines()[:50])}
+{target_file.content_preview}
 {'...' if target_file.line_count > 50 else ''}
 ```
-""")
+""", file=context)
+
+        print("\n## DEPENDENCY GRAPH\n", file=context)
 
-        context_parts.append("\n## DEPENDENCY GRAPH\n")
+        # Files depending on each file, in dependency graph order
+        dependents_by_file: Dict[str, List[str]] = {}
+        for file_path, deps in project_context.dependency_graph.items():
+            for dep in deps:
+                dependents_by_file.setdefault(dep, []).append(file_path)
 
         for target_path in target_paths:
             target_str = str(target_path)
             if target_str in project_context.dependency_graph:
                 deps = project_context.dependency_graph[target_str]
                 if deps:
-                    context_parts.append(f"**{target_path.name}** depends on:")
+                    print(f"**{target_path.name}** depends on:", file=context)
                     for dep in list(deps)[:10]:  # Limit number of dependencies shown
                         dep_name = Path(dep).name
-                        context_parts.append(f"  - {dep_name}")
+                        print(f"  - {dep_name}", file=context)
 
             # Find files that depend on this file
-            dependents = []
-            for file_path, deps in project_context.dependency_graph.items():
-                if target_str in deps:
-                    dependents.append(Path(file_path).name)
+            dependents = [Path(file_path).name for file_path in dependents_by_file.get(target_str, ())]
 
             if dependents:
-                context_parts.append(f"**Files depending on {target_path.name}:**")
+                print(f"**Files depending on {target_path.name}:**", file=context)
                 for dep in dependents[:10]:  # Limit number of dependents shown
-                    context_parts.append(f"  - {dep}")
+                    print(f"  - {dep}", file=context)
 
         # Symbol map
+        symbols_by_file: Dict[str, List[str]] = {}
+        for symbol, file_path in project_context.global_symbols.items():
+            symbols_by_file.setdefault(os.path.normcase(file_path), []).append(symbol)
         relevant_symbols = {}
         for target_path in target_paths:
-            for symbol, file_path in project_context.global_symbols.items():
-                if Path(file_path) == target_path:
-                    relevant_symbols[symbol] = file_path
+            for symbol in symbols_by_file.get(os.path.normcase(str(target_path)), ()):
+                relevant_symbols[symbol] = project_context.global_symbols[symbol]
 
         if relevant_symbols:
-            context_parts.append(f"\n## SYMBOLS IN TARGET FILES\n")
+            print(f"\n## SYMBOLS IN TARGET FILES\n", file=context)
             for symbol, file_path in list(relevant_symbols.items())[:20]:
-                context_parts.append(f"- **{symbol}** defined in {Path(file_path).name}")
+                print(f"- **{symbol}** defined in {Path(file_path).name}", file=context)
 
         # Refactoring task
-        context_parts.append(f"""
+        context.write(f"""
 ## REFACTORING TASK
 {description}
 
@@ -166,7 +201,7 @@ class FixManager:
 6. Warn about possible issues
 """)
 
-        return '\n'.join(context_parts)
+        return context.getvalue()
     
     def _validate_plan(self, plan: Dict[str, Any], project_context: ProjectContext) -> Dict[str, Any]:
         validation = {
@@ -176,10 +211,8 @@ class FixManager:
             'risk_level': 'low'
         }
         
-        # Проверяем на наличие циклических зависимостей
-        cycles = self.context_builder.dependency_analyzer.find_circular_dependencies(
-            project_context.dependency_graph
-        )
+        # Проверяем на наличие циклических зависимостей (найдены при сборке контекста)
+        cycles = project_context.cycles
         
         if cycles:
             validation['errors'].append(f"Обнаружены циклические зависимости: {len(cycles)}")
@@ -199,12 +232,15 @@ class FixManager:
             validation['suggestions'].append("Много файлов будет изменено. Рассмотрите разбиение на несколько этапов.")
             validation['risk_level'] = 'medium'
         
-        # Проверяем на нарушение публичного API
-        for module_name, module_ctx in project_context.modules.items():
-            if any(isinstance(change, str) and 'удалить' in change.lower() and any(api in change for api in module_ctx.public_api) 
-                for change in changes):
-                validation['errors'].append(f"Возможное нарушение публичного API модуля {module_name}")
-                validation['risk_level'] = 'high'
+        # Проверяем на нарушение публичного API: каждое имя ищем один раз во всех удалениях сразу
+        removals = '\0'.join(change for change in changes if isinstance(change, str) and 'удалить' in change.lower())
+        if removals:
+            all_api = {api for module_ctx in project_context.modules.values() for api in module_ctx.public_api}
+            mentioned_api = {api for api in all_api if api in removals}
+            for module_name, module_ctx in project_context.modules.items():
+                if not mentioned_api.isdisjoint(module_ctx.public_api):
+                    validation['errors'].append(f"Возможное нарушение публичного API модуля {module_name}")
+                    validation['risk_level'] = 'high'
         
         return validation
 
@@ -260,11 +296,12 @@ class FixManager:
                     })
                     app_logger.error(error_msg)
             
-            # Автоматически исправляем импорты
-            import_fixes = self._auto_fix_imports(project_context)
+            # Автоматически исправляем импорты; записанный текст запоминаем, чтобы не читать файлы снова
+            written_files: Dict[str, str] = {}
+            import_fixes = self._auto_fix_imports(project_context, written_files)
             
             # Проверяем синтаксис измененных файлов
-            syntax_check = self._validate_syntax(applied_changes)
+            syntax_check = self._validate_syntax(applied_changes, written_files)
             
             return {
                 'success': len(errors) == 0,
@@ -322,48 +359,69 @@ class FixManager:
         """Handles file deletion."""
         return {'type': 'delete', 'status': 'simulated'}
     
-    def _auto_fix_imports(self, project_context: ProjectContext) -> List[Dict[str, Any]]:
-        """Automatically fixes imports after changes."""
+    def _auto_fix_imports(self, project_context: ProjectContext,
+                          written_files: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """Automatically fixes imports after changes.
+        
+        The new content of every rewritten file is stored in written_files, keyed by path.
+        """
         fixes = []
         
         # Проходим по всем файлам и проверяем импорты
         for module_name, module_ctx in project_context.modules.items():
             for file_ctx in module_ctx.files:
-                file_fixes = self._fix_file_imports(file_ctx, project_context)
+                file_fixes = self._fix_file_imports(file_ctx, project_context, written_files)
                 if file_fixes:
                     fixes.extend(file_fixes)
         
         return fixes
     
-    def _fix_file_imports(self, file_ctx, project_context: ProjectContext) -> List[Dict[str, Any]]:
+    def _fix_file_imports(self, file_ctx, project_context: ProjectContext,
+                          written_files: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
         """Fixes imports in a specific file."""
         fixes = []
         
         try:
-            lines = file_ctx.content.splitlines()
-            modified_lines = []
+            content = file_ctx.path.read_text(encoding='utf-8')
+            # _fix_import_line меняет только строки 'from ... import'; нет таких - нечего и разбирать
+            if 'from ' not in content:
+                return fixes
+            # Файл записывается с '\n' между строками splitlines(); строки остальных разделителей приводим к тому же виду
+            text_end = len(content) - 1 if content.endswith('\n') else len(content)
+            if any(char in content for char in _EXTRA_LINE_BREAKS):
+                content = '\n'.join(content.splitlines())
+                text_end = len(content)
             
-            for line_num, line in enumerate(lines):
-                original_line = line
-                
-                # Проверяем импорты
-                if line.strip().startswith(('import ', 'from ')):
-                    fixed_line = self._fix_import_line(line, project_context)
-                    if fixed_line != line:
-                        fixes.append({
-                            'file': str(file_ctx.path),
-                            'line_number': line_num + 1,
-                            'original': original_line,
-                            'fixed': fixed_line,
-                            'type': 'import_fix'
-                        })
-                        line = fixed_line
-                
-                modified_lines.append(line)
+            # Просматриваем только строки 'from ...', остальные строки не копируются
+            pieces = []
+            copied_to = 0
+            line_num = 1
+            counted_to = 0
+            for start, end in _iter_from_lines(content):
+                line = content[start:end]
+                fixed_line = self._fix_import_line(line, project_context)
+                if fixed_line != line:
+                    line_num += content.count('\n', counted_to, start)
+                    counted_to = start
+                    fixes.append({
+                        'file': str(file_ctx.path),
+                        'line_number': line_num,
+                        'original': line,
+                        'fixed': fixed_line,
+                        'type': 'import_fix'
+                    })
+                    pieces.append(content[copied_to:start])
+                    pieces.append(fixed_line)
+                    copied_to = end
             
             # Записываем исправленный файл, если были изменения
             if fixes:
-                file_ctx.path.write_text('\n'.join(modified_lines), encoding='utf-8')
+                pieces.append(content[copied_to:text_end])
+                new_content = ''.join(pieces)
+                # Без текстового слоя: '\n' пишется как есть, как и в file_ops.write_file
+                file_ctx.path.write_bytes(new_content.encode('utf-8'))
+                if written_files is not None:
+                    written_files[str(file_ctx.path)] = new_content
                 
         except Exception as e:
             fixes.append({
@@ -380,24 +438,45 @@ class FixManager:
         # В реальности здесь должна быть более сложная логика
         
         # Проверяем, существует ли импортируемый модуль
-        if import_line.strip().startswith('from '):
-            match = re.match(r'from\s+([^\s]+)\s+import', import_line)
-            if match:
-                module_name = match.group(1)
+        if import_line.startswith('from '):
+            # 'from <модуль> import ...' с начала строки
+            parts = import_line.split(None, 2)
+            if len(parts) == 3 and parts[2].startswith('import'):
+                module_name = parts[1]
                 
                 # Если модуль не найден в карте импортов, пытаемся найти альтернативу
                 if module_name not in project_context.import_map:
-                    # Ищем похожие модули
-                    similar_modules = [m for m in project_context.import_map.keys() 
-                                     if module_name.split('.')[-1] in m]
-                    if similar_modules:
-                        new_module = similar_modules[0]
+                    # Ищем похожий модуль
+                    new_module = self._find_similar_module(module_name, project_context.import_map)
+                    if new_module is not None:
                         return import_line.replace(module_name, new_module)
         
         return import_line
     
-    def _validate_syntax(self, applied_changes: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Validates syntax of changed Python files."""
+    def _find_similar_module(self, module_name: str, import_map: Dict[str, str]) -> Optional[str]:
+        """Returns the first module in import_map whose name contains the last part of module_name.
+        
+        Answers are remembered per short name for the current import map,
+        since the same missing modules repeat across the fixed files.
+        """
+        if self._similar_modules_map is not import_map:
+            self._similar_modules_map = import_map
+            self._similar_modules = {}
+        short_name = module_name.split('.')[-1]
+        try:
+            return self._similar_modules[short_name]
+        except KeyError:
+            pass
+        similar = next((module for module in import_map if short_name in module), None)
+        self._similar_modules[short_name] = similar
+        return similar
+    
+    def _validate_syntax(self, applied_changes: List[Dict[str, Any]],
+                         written_files: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Validates syntax of changed Python files.
+        
+        Files found in written_files are checked from that content instead of being read again.
+        """
         syntax_check = {
             'valid_files': [],
             'invalid_files': [],
@@ -418,8 +497,12 @@ class FixManager:
             syntax_check['total_checked'] += 1
             
             try:
-                content = file_path.read_text(encoding='utf-8')
-                ast.parse(content)
+                content = written_files.get(str(file_path)) if written_files else None
+                if content is None:
+                    # Байты декодирует сам компилятор, с учетом BOM и объявления кодировки
+                    content = file_path.read_bytes()
+                # Нужна только проверка синтаксиса: дерево без байткода
+                compile(content, str(file_path), 'exec', ast.PyCF_ONLY_AST)
                 syntax_check['valid_files'].append(str(file_path))
                 
             except SyntaxError as e:
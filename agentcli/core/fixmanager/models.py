@@ -1,15 +1,23 @@
-import ast
 from pathlib import Path
-from typing import Dict, List, Set, Optional
-from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Set, Tuple
+from dataclasses import dataclass, field
 from datetime import datetime
 
-@dataclass
+class ImportInfo(NamedTuple):
+    kind: str  # 'import' or 'from'
+    module: str
+    names: Tuple[str, ...] = ()
+    
+    def __str__(self) -> str:
+        if self.kind == 'from':
+            return f"from {self.module} import {', '.join(self.names)}"
+        return f"import {self.module}"
+
+@dataclass(slots=True)
 class FileContext:
     path: Path
-    content: str
-    ast_tree: Optional[ast.AST]
-    imports: List[str]
+    content_preview: str  # first 50 lines
+    imports: List[ImportInfo]
     exports: List[str]
     dependencies: Set[str]
     dependents: Set[str]
@@ -17,7 +25,7 @@ class FileContext:
     last_modified: datetime
     line_count: int
 
-@dataclass
+@dataclass(slots=True)
 class ModuleContext:
     name: str
     path: Path
@@ -27,7 +35,7 @@ class ModuleContext:
     internal_dependencies: Set[str]
     external_dependencies: Set[str]
 
-@dataclass
+@dataclass(slots=True)
 class ProjectContext:
     root_path: Path
     modules: Dict[str, ModuleContext]
@@ -36,4 +44,5 @@ class ProjectContext:
     global_symbols: Dict[str, str]
     architecture_patterns: List[str]
     config_files: List[Path]
-    test_files: List[Path]
\ No newline at end of file
+    test_files: List[Path]
+    cycles: List[List[str]] = field(default_factory=list)  # группы циклически зависимых файлов
\ No newline at end of file
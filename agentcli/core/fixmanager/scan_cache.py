@@ -0,0 +1,119 @@
+"""On-disk cache of per-module scan results."""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from agentcli.utils.logging import logger
+
+from .models import ImportInfo
+
+# Imports, exports and complexity score of a module
+ScanResult = Tuple[List[ImportInfo], List[str], int]
+
+# Bumped whenever the scan or the entry layout changes, so older entries are not reused
+SCAN_FORMAT_VERSION = 1
+
+# Kept inside the project, next to the other AgentCLI caches
+SCAN_CACHE_DIR = Path('.agentcli') / 'cache' / 'scan'
+
+# Entries kept after pruning; the least recently used ones are removed first
+MAX_SCAN_CACHE_ENTRIES = 4096
+
+
+def _cache_key(content: str) -> str:
+    """Hashes source together with the interpreter version, whose parser decides what is valid syntax."""
+    digest = hashlib.sha256(f"{SCAN_FORMAT_VERSION}:{sys.version}".encode())
+    digest.update(content.encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+
+class ScanCache:
+    """Stores scan results of a project's modules, keyed by a hash of their source."""
+
+    def __init__(self, root_path: Path, max_entries: int = MAX_SCAN_CACHE_ENTRIES):
+        """Initialize the scan cache.
+
+        Args:
+            root_path (Path): Root directory of the project.
+            max_entries (int): Number of entries prune() keeps.
+        """
+        self.cache_dir = root_path / SCAN_CACHE_DIR
+        self.max_entries = max_entries
+
+    def get(self, content: str, scan: Callable[[str], ScanResult]) -> ScanResult:
+        """Scans Python source, reusing a stored result for identical content.
+
+        Entries are plain JSON, so reading one never runs code. Unreadable
+        entries are ignored and the source is scanned again.
+
+        Args:
+            content (str): Python source code.
+            scan (Callable[[str], ScanResult]): Computes the result on a cache miss.
+
+        Returns:
+            ScanResult: Imports, exports and complexity score of the source.
+        """
+        cache_file = self.cache_dir / f"{_cache_key(content)}.json"
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            imports = [ImportInfo(kind, module, tuple(names)) for kind, module, names in entry['imports']]
+            result = imports, entry['exports'], entry['complexity']
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.debug("Ignoring unreadable scan cache entry %s: %s", cache_file, e)
+        else:
+            self._touch(cache_file)
+            return result
+
+        imports, exports, complexity = result = scan(content)
+        entry = {'imports': [list(imp) for imp in imports], 'exports': exports, 'complexity': complexity}
+        self._write_entry(cache_file, json.dumps(entry))
+        return result
+
+    def prune(self) -> None:
+        """Removes the least recently used entries once there are more than max_entries."""
+        try:
+            with os.scandir(self.cache_dir) as entries:
+                cache_files = [(entry.stat().st_mtime_ns, entry.path) for entry in entries
+                               if entry.name.endswith('.json')]
+        except OSError:
+            return
+        if len(cache_files) <= self.max_entries:
+            return
+        cache_files.sort()
+        for _, path in cache_files[:len(cache_files) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.debug("Could not remove scan cache entry %s: %s", path, e)
+
+    def _touch(self, cache_file: Path) -> None:
+        """Marks an entry as recently used, so prune() keeps it."""
+        try:
+            os.utime(cache_file)
+        except OSError:
+            pass
+
+    def _write_entry(self, cache_file: Path, data: str) -> None:
+        """Writes an entry atomically; the cache is optional, so failures are only logged at debug level."""
+        tmp_path = None
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, cache_file)
+        except OSError as e:
+            logger.debug("Could not write scan cache entry %s: %s", cache_file, e)
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
@@ -1,16 +1,93 @@
 import ast
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Set, Tuple
+from typing import Iterable, List, Optional, Set, Tuple
 from datetime import datetime
 
 from .models import FileContext, ModuleContext
-from .dependency_analyzer import DependencyAnalyzer
+from .dependency_analyzer import DependencyAnalyzer, collect_imports, parse_source, walk_statements
+from .scan_cache import ScanCache, ScanResult
+
+# Below this many files, starting worker processes costs more than it saves
+PARALLEL_ANALYSIS_THRESHOLD = 64
+
+# Node types are matched exactly: the parser never produces subclasses of them
+_BRANCH_TYPE_SET = frozenset({ast.If, ast.While, ast.For, ast.With})
+_FUNCTION_TYPE_SET = frozenset({ast.FunctionDef, ast.AsyncFunctionDef})
+_IMPORT_TYPE_SET = frozenset({ast.Import, ast.ImportFrom})
+_SCANNED_TYPE_SET = _BRANCH_TYPE_SET | _FUNCTION_TYPE_SET | _IMPORT_TYPE_SET | {ast.ClassDef, ast.Assign, ast.Try}
+
+# Line boundaries str.splitlines() recognizes besides '\n'
+_EXTRA_LINE_BREAKS = '\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029'
+
+def _count_lines(content: str) -> int:
+    """Returns len(content.splitlines()) without building the list of lines."""
+    if any(char in content for char in _EXTRA_LINE_BREAKS):
+        return len(content.splitlines())
+    return content.count('\n') + (1 if content and not content.endswith('\n') else 0)
+
+def _first_lines(text: str, count: int) -> List[str]:
+    """Returns text.splitlines()[:count] without splitting the rest of the text."""
+    # Каждая строка splitlines заканчивается не позже очередного '\n'
+    end = 0
+    for _ in range(count):
+        end = text.find('\n', end) + 1
+        if not end:
+            end = len(text)
+            break
+    return text[:end].splitlines()[:count]
+
+class _FileScanner:
+    """Collects imports, exports and complexity of a module in a single pass."""
+    
+    def __init__(self):
+        self.import_nodes: List[ast.AST] = []
+        self.exports: List[str] = []
+        self.complexity = 0
+        
+    def scan(self, tree: ast.AST) -> '_FileScanner':
+        # Все нужные узлы - операторы, выражения не обходим; порядок как у ast.walk
+        for node in walk_statements(tree):
+            node_type = type(node)
+            if node_type not in _SCANNED_TYPE_SET:
+                continue
+            if node_type in _BRANCH_TYPE_SET:
+                self.complexity += 1
+            elif node_type in _IMPORT_TYPE_SET:
+                self.import_nodes.append(node)
+            elif node_type in _FUNCTION_TYPE_SET:
+                if not node.name.startswith('_'):
+                    self.exports.append(f"function:{node.name}")
+            elif node_type is ast.ClassDef:
+                if not node.name.startswith('_'):
+                    self.exports.append(f"class:{node.name}")
+            elif node_type is ast.Assign:
+                for target in node.targets:
+                    if type(target) is ast.Name and not target.id.startswith('_'):
+                        self.exports.append(f"variable:{target.id}")
+            else:
+                self.complexity += len(node.handlers)
+        return self
+
+def _scan_source(content: str) -> ScanResult:
+    """Collects imports, exports and complexity of module source; invalid source has none."""
+    try:
+        tree = parse_source(content)
+    except SyntaxError:
+        return [], [], 0
+    scanner = _FileScanner().scan(tree)
+    return collect_imports(scanner.import_nodes), scanner.exports, scanner.complexity
 
 class ModuleStructureAnalyzer:
     """Module structure and architecture pattern analyzer."""
     
-    def __init__(self, root_path: Path):
+    def __init__(self, root_path: Path, dependency_analyzer: Optional[DependencyAnalyzer] = None,
+                 use_scan_cache: bool = True):
         self.root_path = root_path
+        self.dependency_analyzer = dependency_analyzer or DependencyAnalyzer(root_path)
+        # Результаты обхода файлов между запусками; None - кеш отключен
+        self.scan_cache = ScanCache(root_path) if use_scan_cache else None
         
     def analyze_module_structure(self, module_path: Path) -> ModuleContext:
         files = []
@@ -52,60 +129,46 @@ class ModuleStructureAnalyzer:
             external_dependencies=external_deps
         )
     
+    def analyze_files(self, file_paths: Iterable[Path]) -> List[Optional[FileContext]]:
+        """Analyzes files in worker processes when there are enough of them.
+        
+        Returns one result per path, None for files that could not be read.
+        """
+        file_paths = list(file_paths)
+        if len(file_paths) < PARALLEL_ANALYSIS_THRESHOLD or (os.cpu_count() or 1) < 2:
+            return [self._analyze_single_file(file_path) for file_path in file_paths]
+        with ProcessPoolExecutor(initializer=_init_worker,
+                                 initargs=(self.root_path, self.scan_cache is not None)) as pool:
+            return list(pool.map(_analyze_file_in_worker, file_paths, chunksize=8))
+    
     def _analyze_single_file(self, file_path: Path) -> Optional[FileContext]:
         try:
             content = file_path.read_text(encoding='utf-8')
         except (UnicodeDecodeError, PermissionError):
             return None
             
-        try:
-            tree = ast.parse(content)
-        except SyntaxError:
-            tree = None
-            
-        # Анализируем импорты
-        analyzer = DependencyAnalyzer(self.root_path)
-        imports, dependencies = analyzer.analyze_file_imports(file_path, content)
-        
-        # Извлекаем экспорты (функции, классы, переменные)
-        exports = self._extract_exports(tree) if tree else []
-        
-        # Вычисляем сложность
-        complexity = self._calculate_complexity(tree) if tree else 0
+        # Результат обхода зависит только от текста; зависимости - еще и от файлов на диске
+        if self.scan_cache:
+            imports, exports, complexity = self.scan_cache.get(content, _scan_source)
+        else:
+            imports, exports, complexity = _scan_source(content)
+        dependencies = self.dependency_analyzer.resolve_dependencies(file_path, imports)
         
         # Находим dependents (будет заполнено позже)
         dependents = set()
         
         return FileContext(
             path=file_path,
-            content=content,
-            ast_tree=tree,
+            content_preview='\n'.join(_first_lines(content, 50)),
             imports=imports,
             exports=exports,
             dependencies=dependencies,
             dependents=dependents,
             complexity_score=complexity,
             last_modified=datetime.fromtimestamp(file_path.stat().st_mtime),
-            line_count=len(content.splitlines())
+            line_count=_count_lines(content)
         )
     
-    def _extract_exports(self, tree: ast.AST) -> List[str]:
-        exports = []
-        
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                if not node.name.startswith('_'):
-                    exports.append(f"function:{node.name}")
-            elif isinstance(node, ast.ClassDef):
-                if not node.name.startswith('_'):
-                    exports.append(f"class:{node.name}")
-            elif isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Name) and not target.id.startswith('_'):
-                        exports.append(f"variable:{target.id}")
-                        
-        return exports
-    
     def _extract_public_api(self, files: List[FileContext]) -> List[str]:
         public_api = []
 
@@ -115,17 +178,16 @@ class ModuleStructureAnalyzer:
                 init_file = file_ctx
                 break
                 
-        if init_file and init_file.ast_tree:
-            for node in ast.walk(init_file.ast_tree):
-                if isinstance(node, ast.Assign):
-                    for target in node.targets:
-                        if isinstance(target, ast.Name) and target.id == '__all__':
-                            if isinstance(node.value, ast.List):
-                                for elt in node.value.elts:
-                                    if isinstance(elt, ast.Str):
-                                        public_api.append(elt.s)
-                                    elif isinstance(elt, ast.Constant) and isinstance(elt.value, str):
-                                        public_api.append(elt.value)
+        # Дерево не хранится в FileContext, __init__.py разбираем заново
+        init_tree = self._parse_file(init_file.path) if init_file else None
+        if init_tree:
+            # __all__ задается на уровне модуля
+            for node in init_tree.body:
+                if (isinstance(node, ast.Assign) and isinstance(node.value, ast.List)
+                        and any(isinstance(target, ast.Name) and target.id == '__all__' for target in node.targets)):
+                    public_api.extend(elt.value for elt in node.value.elts
+                                      if isinstance(elt, ast.Constant) and isinstance(elt.value, str))
+                    break
         
         if not public_api:
             for file_ctx in files:
@@ -133,27 +195,28 @@ class ModuleStructureAnalyzer:
                 
         return public_api
     
+    def _parse_file(self, file_path: Path) -> Optional[ast.AST]:
+        try:
+            return parse_source(file_path.read_text(encoding='utf-8'))
+        except (UnicodeDecodeError, PermissionError, SyntaxError):
+            return None
+    
     def _analyze_module_dependencies(self, files: List[FileContext]) -> Tuple[Set[str], Set[str]]:
+        # Зависимости разрешаются только в файлы проекта, внешних среди них нет
         internal_deps = set()
         external_deps = set()
         
         for file_ctx in files:
-            for dep in file_ctx.dependencies:
-                dep_path = Path(dep)
-                if dep_path.is_relative_to(self.root_path):
-                    internal_deps.add(dep)
-                else:
-                    external_deps.add(dep)
+            internal_deps.update(file_ctx.dependencies)
                     
         return internal_deps, external_deps
-    
-    def _calculate_complexity(self, tree: ast.AST) -> int:
-        complexity = 0
-        
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.If, ast.While, ast.For, ast.With)):
-                complexity += 1
-            elif isinstance(node, ast.Try):
-                complexity += len(node.handlers)
-                
-        return complexity
\ No newline at end of file
+
+
+_worker_analyzer: Optional[ModuleStructureAnalyzer] = None
+
+def _init_worker(root_path: Path, use_scan_cache: bool):
+    global _worker_analyzer
+    _worker_analyzer = ModuleStructureAnalyzer(root_path, use_scan_cache=use_scan_cache)
+
+def _analyze_file_in_worker(file_path: Path) -> Optional[FileContext]:
+    return _worker_analyzer._analyze_single_file(file_path)
\ No newline at end of file
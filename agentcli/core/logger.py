@@ -11,6 +11,8 @@ class Logger:
     def __init__(self, log_dir=".agentcli/logs"):
         self.log_dir = log_dir
         self._sequence_counter = 0
+        # Bumped on every write so readers can tell when cached log listings are stale
+        self.generation = 0
         os.makedirs(self.log_dir, exist_ok=True)
         
     def log_action(self, action, description, details=None):
@@ -34,5 +36,6 @@ class Logger:
         log_path = os.path.join(self.log_dir, f"{log_id}.json")
         with open(log_path, 'w') as f:
             json.dump(log_entry, f, indent=2)
+        self.generation += 1
         
         return log_id